@@ -0,0 +1,629 @@
+"""
+End-to-end throughput benchmark: local stand-ins for TMDB (search + images),
+the Internet Archive (metadata, scrape search, artwork), Ollama (/api/generate,
+with configurable per-token latency) and the Telegram Bot API, and synthetic
+updates (forwarded videos, archive.org links, external links, /search) fed to
+the Application built by bot.build_application(), i.e. the real handlers,
+update processor, send scheduler, ingest queue and render pool.
+
+Reports items/sec and p50/p95 latency (update received -> final Bot API call
+for that item) per flow, peak RSS, and the per-stage Metrics summary.
+With --json the results are saved; with --baseline a previous result is
+compared and the exit code is 1 on a regression beyond --tolerance.
+
+Telegram rate limits are lifted (use --telegram-limits to keep them) so the
+numbers measure the bot, not the flood-control budget. The fake servers run in
+the same process, so RSS and CPU include them (a small, constant overhead).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_e2e [--videos 40] [--archives 20] [--links 20] [--searches 10]
+                                   [--ollama-token-latency 0.01] [--json out.json] [--baseline old.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from email.parser import BytesParser
+from io import BytesIO
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+# settings reads the environment at import time: isolate caches/databases before importing cinegram
+WORKDIR = tempfile.mkdtemp(prefix="cinegram-bench-")
+CHANNEL_ID = -1001000000001
+BOT_TOKEN = "123456:BENCHMARK"
+os.environ.update({
+    "BOT_TOKEN": BOT_TOKEN,
+    "CHANNEL_ID": str(CHANNEL_ID),
+    "TMDB_API_KEY": "benchmark",
+    "CACHE_DIR": os.path.join(WORKDIR, "cache"),
+    "USERS_DB_PATH": os.path.join(WORKDIR, "users.sqlite3"),
+    "CATALOG_DB_PATH": os.path.join(WORKDIR, "catalog.sqlite3"),
+    "UPLOAD_DIR": os.path.join(WORKDIR, "uploads"),
+    "BOT_API_BASE_URL": "",
+    "WEBHOOK_URL": "",
+    "METRICS_PORT": "0",
+})
+if "--telegram-limits" not in sys.argv:
+    os.environ.update({"TG_GLOBAL_RATE": "100000", "TG_PRIVATE_CHAT_RATE": "100000", "TG_GROUP_CHAT_PER_MINUTE": "6000000"})
+
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+from telegram import Update  # noqa: E402
+from cinegram import bot as bot_module  # noqa: E402
+from cinegram.config import settings  # noqa: E402
+from cinegram.services.auth_service import AuthService  # noqa: E402
+from cinegram.services.http_client import HttpClient  # noqa: E402
+from cinegram.services.metrics import Metrics  # noqa: E402
+
+FLOWS = ("video", "archive", "link", "search")
+USER_BASE_ID = 700000000
+
+# Title words unlikely to be taken for release tags
+WORDS = [
+    "Silent", "Crimson", "Midnight", "River", "Golden", "Shadow", "Winter", "Garden", "Iron", "Harbor",
+    "Velvet", "Storm", "Hollow", "Lantern", "Desert", "Echo", "Marble", "Orchard", "Ember", "Canyon",
+    "Willow", "Falcon", "Meadow", "Copper", "Glacier", "Prairie", "Thunder", "Comet", "Raven", "Island"
+]
+SYNOPSIS_WORDS = ("una historia de amor y venganza en la ciudad donde nadie duerme y todos "
+                  "esconden algo que podría cambiar su destino para siempre").split()
+
+
+def make_title(index: int) -> str:
+    n = len(WORDS)
+    return f"{WORDS[index % n]} {WORDS[index // n % n]} {WORDS[index // (n * n) % n]}"
+
+
+def make_jpeg(width: int, height: int) -> bytes:
+    gradient = Image.linear_gradient("L").resize((width, height))
+    image = Image.merge("RGB", (gradient, gradient.rotate(90).resize((width, height)), gradient))
+    out = BytesIO()
+    image.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+
+# --- Minimal HTTP/1.1 server -------------------------------------------------
+
+class FakeRequest:
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.host = headers.get("host", "")
+        self.body = body
+
+    def form(self) -> Dict[str, str]:
+        """Form fields of an urlencoded or multipart body (file parts are skipped)."""
+        content_type = self.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            message = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + self.body)
+            return {
+                part.get_param("name", header="content-disposition"): part.get_payload(decode=True).decode("utf-8", "replace")
+                for part in message.get_payload()
+                if not part.get_param("filename", header="content-disposition")
+            }
+        if content_type.startswith("application/json"):
+            return json.loads(self.body or b"{}")
+        return {key: values[0] for key, values in parse_qs(self.body.decode("utf-8")).items()}
+
+
+# A route returns (status, content type, body); the body may be an async iterator (sent chunked)
+Response = tuple
+Route = Callable[[FakeRequest], Awaitable[Response]]
+
+
+class FakeServer:
+    """Keep-alive HTTP/1.1 server on 127.0.0.1 (random port), enough for httpx clients."""
+
+    def __init__(self, route: Route):
+        self.route = route
+        self.port = None
+        self._server = None
+        self._writers = set()
+        self._active = 0
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def drain(self, timeout: float = 10):
+        """Waits for the requests in flight (e.g. the status replies sent after a publication)."""
+        deadline = time.monotonic() + timeout
+        while self._active and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def stop(self):
+        for writer in list(self._writers): # Idle keep-alive connections
+            writer.close()
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _read_body(self, reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    return b"".join(chunks)
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+        return await reader.readexactly(int(headers.get("content-length") or 0))
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, value = line.decode("latin-1").split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                request = FakeRequest(method, target, headers, await self._read_body(reader, headers))
+
+                self._active += 1
+                try:
+                    status, content_type, body = await self.route(request)
+                finally:
+                    self._active -= 1
+                head = f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                if isinstance(body, (bytes, str)):
+                    body = body.encode("utf-8") if isinstance(body, str) else body
+                    writer.write(f"{head}Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+                else:
+                    writer.write(f"{head}Transfer-Encoding: chunked\r\n\r\n".encode("latin-1"))
+                    async for chunk in body:
+                        writer.write(f"{len(chunk):x}\r\n".encode("latin-1") + chunk + b"\r\n")
+                        await writer.drain()
+                    writer.write(b"0\r\n\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # Client went away (e.g. translation stopped early)
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+class LoopbackTransport(httpx.AsyncHTTPTransport):
+    """Sends every request to the local fake server; the Host header keeps the real upstream name."""
+
+    def __init__(self, port: int, **kwargs):
+        super().__init__(**kwargs)
+        self.port = port
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(scheme="http", host="127.0.0.1", port=self.port)
+        return await super().handle_async_request(request)
+
+
+def install_loopback(port: int):
+    """Replaces the shared HttpClient pool by one (same limits/timeouts) whose transport is the loopback."""
+    HttpClient._client = httpx.AsyncClient(
+        transport=LoopbackTransport(port, limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=30
+        )),
+        follow_redirects=True,
+        timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+        headers={"User-Agent": "CineGramBot/1.0"}
+    )
+
+
+# --- Upstream stand-ins ------------------------------------------------------
+
+class Upstreams:
+    """TMDB, Internet Archive and Ollama, routed on the Host header."""
+
+    def __init__(self, latency: float, token_latency: float, tokens: int, english_ratio: float):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.tokens = tokens
+        self.english_ratio = english_ratio # Share of titles with no es-MX overview (-> translation)
+        self.tmdb_poster = make_jpeg(780, 1170)
+        self.ia_artwork = make_jpeg(640, 480)
+        self.items: Dict[str, dict] = {} # IA identifier -> (title, year)
+        self.requests = 0
+
+    @staticmethod
+    def _json(data: Any, status: str = "200 OK") -> Response:
+        return status, "application/json", json.dumps(data)
+
+    async def route(self, request: FakeRequest) -> Response:
+        self.requests += 1
+        host = request.host.split(":")[0]
+        if host == "api.themoviedb.org" and request.path == "/3/search/movie":
+            return await self.tmdb_search(request)
+        if host == "image.tmdb.org":
+            await asyncio.sleep(self.latency)
+            return "200 OK", "image/jpeg", self.tmdb_poster
+        if host == "archive.org" and request.path.startswith("/metadata/"):
+            return await self.ia_metadata(request.path[len("/metadata/"):])
+        if host == "archive.org" and request.path == "/services/search/v1/scrape":
+            return await self.ia_scrape(request)
+        if host.endswith(".archive.org"):
+            await asyncio.sleep(self.latency)
+            return "200 OK", "image/jpeg", self.ia_artwork
+        if host == "localhost" and request.path == "/api/generate":
+            return await self.ollama_generate(request)
+        return "404 Not Found", "text/plain", "not found"
+
+    async def tmdb_search(self, request: FakeRequest) -> Response:
+        await asyncio.sleep(self.latency)
+        title = request.query.get("query", "")
+        movie_id = zlib.crc32(title.casefold().encode("utf-8"))
+        english_only = movie_id % 1000 < self.english_ratio * 1000
+        if english_only and request.query.get("language") != "en-US":
+            return self._json({"page": 1, "results": [], "total_results": 0})
+        overview = (f"A story of love and revenge in {title}, a city where nobody sleeps. " * 4 if english_only
+                    else f"Una historia de amor y venganza en {title}, la ciudad donde nadie duerme. " * 4)
+        return self._json({"page": 1, "total_results": 1, "results": [{
+            "id": movie_id,
+            "title": title,
+            "overview": overview.strip(),
+            "release_date": f"{request.query.get('year') or 1990 + movie_id % 30}-05-01",
+            "poster_path": f"/p{movie_id}.jpg",
+            "backdrop_path": f"/b{movie_id}.jpg",
+            "genre_ids": [18, 53],
+            "vote_average": 5 + movie_id % 50 / 10
+        }]})
+
+    async def ia_metadata(self, identifier: str) -> Response:
+        await asyncio.sleep(self.latency)
+        if identifier not in self.items:
+            return self._json({})
+        title, year = self.items[identifier]
+        return self._json({
+            "metadata": {
+                "identifier": identifier, "title": title, "date": f"{year}-01-01",
+                "description": f"{title} ({year}), public domain feature film.", "subject": "Drama",
+                "language": "Spanish", "mediatype": "movies"
+            },
+            "server": "ia800100.us.archive.org",
+            "dir": f"/1/items/{identifier}",
+            "files": [
+                {"name": f"{identifier}.mp4", "format": "h.264", "size": str(15 * 1024 * 1024)},
+                {"name": f"{identifier}_512kb.mp4", "format": "512Kb MPEG4", "size": str(6 * 1024 * 1024)},
+                {"name": f"{identifier}.ogv", "format": "Ogg Video", "size": str(9 * 1024 * 1024)},
+                {"name": "cover.jpg", "format": "JPEG", "size": "120000"},
+                {"name": f"{identifier}.thumbs/{identifier}_000001.jpg", "format": "Thumbnail", "size": "6000"},
+                {"name": f"{identifier}_meta.xml", "format": "Metadata", "size": "2000"},
+            ]
+        })
+
+    async def ia_scrape(self, request: FakeRequest) -> Response:
+        await asyncio.sleep(self.latency)
+        query = request.query.get("q", "")
+        seed = zlib.crc32(query.encode("utf-8"))
+        items = [
+            {"identifier": f"bench_{seed:x}_{n}", "title": f"Result {n} {WORDS[(seed + n) % len(WORDS)]}",
+             "year": str(1930 + (seed + n) % 60), "downloads": 10000 - n}
+            for n in range(int(request.query.get("count", 100)))
+        ]
+        return self._json({"items": items, "count": len(items), "total": len(items)})
+
+    async def ollama_generate(self, request: FakeRequest) -> Response:
+        payload = json.loads(request.body or b"{}")
+        words = [SYNOPSIS_WORDS[n % len(SYNOPSIS_WORDS)] + ("." if n % 12 == 11 else "") for n in range(self.tokens)]
+        if not payload.get("stream", True):
+            await asyncio.sleep(self.token_latency * self.tokens)
+            return self._json({"model": payload.get("model"), "response": " ".join(words), "done": True})
+
+        async def tokens():
+            for word in words:
+                await asyncio.sleep(self.token_latency)
+                yield (json.dumps({"response": word + " ", "done": False}) + "\n").encode("utf-8")
+            yield (json.dumps({"response": "", "done": True}) + "\n").encode("utf-8")
+
+        return "200 OK", "application/x-ndjson", tokens()
+
+
+# --- Bot API stand-in --------------------------------------------------------
+
+class FakeBotApi:
+    """Answers Bot API calls with plausible objects and reports each call to on_call."""
+
+    def __init__(self, latency: float, on_call: Callable[[str, dict], None]):
+        self.latency = latency
+        self.on_call = on_call
+        self.calls: Dict[str, int] = {}
+        self._message_id = 0
+
+    def _message(self, params: dict, **extra) -> dict:
+        self._message_id += 1
+        chat_id = int(params.get("chat_id", 0))
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "channel"},
+            **({"text": params["text"]} if "text" in params else {}),
+            **({"caption": params["caption"]} if "caption" in params else {}),
+            **extra
+        }
+
+    async def route(self, request: FakeRequest) -> Response:
+        method = request.path.rsplit("/", 1)[-1]
+        params = request.form()
+        self.calls[method] = self.calls.get(method, 0) + 1
+        await asyncio.sleep(self.latency)
+
+        if method == "getMe":
+            result = {"id": 123456, "is_bot": True, "first_name": "CineGram", "username": "cinegram_bench_bot"}
+        elif method == "sendPhoto":
+            file_id = f"photo{self._message_id}"
+            result = self._message(params, photo=[
+                {"file_id": file_id, "file_unique_id": file_id, "width": 1280, "height": 720, "file_size": 150000}
+            ])
+        elif method == "sendVideo":
+            file_id = params.get("video") or f"video{self._message_id}"
+            result = self._message(params, video={
+                "file_id": file_id, "file_unique_id": f"u{self._message_id}", "width": 1280, "height": 720, "duration": 5400
+            })
+        elif method in ("sendMessage", "editMessageText"):
+            result = self._message(params)
+        else:
+            result = True
+
+        self.on_call(method, params)
+        return "200 OK", "application/json", json.dumps({"ok": True, "result": result})
+
+
+# --- Synthetic updates -------------------------------------------------------
+
+class Item:
+    def __init__(self, flow: str, index: int, title: str, year: int, user_id: int):
+        self.flow = flow
+        self.index = index
+        self.title = title
+        self.year = year
+        self.user_id = user_id
+        self.key = title.casefold()
+        self.sent_at: Optional[float] = None
+        self.done_at: Optional[float] = None
+
+    @property
+    def latency(self) -> Optional[float]:
+        return self.done_at - self.sent_at if self.done_at and self.sent_at else None
+
+    def text_message(self, text: str, entity: Optional[str] = None, length: Optional[int] = None) -> dict:
+        message = {"text": text}
+        if entity:
+            message["entities"] = [{"type": entity, "offset": 0, "length": length or len(text)}]
+        return message
+
+    def update(self, update_id: int) -> dict:
+        slug = self.title.lower().replace(" ", "_")
+        if self.flow == "video":
+            name = f"{self.title.replace(' ', '.')}.{self.year}.1080p.WEB-DL.x264-BENCH.mkv"
+            content = {"video": {
+                "file_id": f"vid{self.index}", "file_unique_id": f"uv{self.index}", "width": 1920, "height": 1080,
+                "duration": 5400, "file_name": name, "mime_type": "video/x-matroska"
+            }}
+        elif self.flow == "archive":
+            content = self.text_message(f"https://archive.org/details/{slug}_{self.year}", "url")
+        elif self.flow == "link":
+            url = f"https://cdn.example.com/{slug}.mp4"
+            content = self.text_message(f"{url} | {self.title} | {self.year}", "url", len(url))
+        else:
+            content = self.text_message(f"/search {self.title}", "bot_command", len("/search"))
+        return {"update_id": update_id, "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": self.user_id, "type": "private"},
+            "from": {"id": self.user_id, "is_bot": False, "first_name": "Bench"},
+            **content
+        }}
+
+    def completed_by(self, method: str, params: dict) -> bool:
+        chat_id = int(params.get("chat_id", 0))
+        if self.flow == "video":
+            return method == "sendVideo" and chat_id == CHANNEL_ID and self.key in params.get("caption", "").casefold()
+        if self.flow == "search":
+            return method == "sendMessage" and chat_id == self.user_id and "reply_markup" in params
+        body = params.get("caption") or params.get("text") or ""
+        return method in ("sendVideo", "sendMessage") and chat_id == self.user_id and "Película" in body \
+            and self.key in body.casefold()
+
+
+class Tracker:
+    """Matches Bot API calls to the items they complete."""
+
+    def __init__(self, items: List[Item]):
+        self.pending: Dict[int, List[Item]] = {}
+        for item in items:
+            self.pending.setdefault(item.user_id, []).append(item)
+        self.remaining = len(items)
+        self.finished = asyncio.Event()
+        if not items:
+            self.finished.set()
+
+    def on_call(self, method: str, params: dict):
+        candidates = self.pending.get(int(params.get("chat_id", 0)), [])
+        if method == "sendVideo" and int(params.get("chat_id", 0)) == CHANNEL_ID:
+            candidates = [item for items in self.pending.values() for item in items if item.flow == "video"]
+        for item in candidates:
+            if item.sent_at is not None and item.completed_by(method, params):
+                item.done_at = time.perf_counter()
+                self.pending[item.user_id].remove(item)
+                self.remaining -= 1
+                if not self.remaining:
+                    self.finished.set()
+                return
+
+
+def build_items(counts: Dict[str, int], users: int) -> List[Item]:
+    items = []
+    index = 0
+    for flow in FLOWS:
+        for _ in range(counts[flow]):
+            items.append(Item(flow, index, make_title(index), 1930 + index % 90, USER_BASE_ID + index % users))
+            index += 1
+    # Interleave flows, as real traffic would
+    return sorted(items, key=lambda item: (item.index * 7919) % len(items))
+
+
+# --- Run and report ----------------------------------------------------------
+
+def percentile(values: List[float], quantile: float) -> Optional[float]:
+    return Metrics.percentile(values, quantile) if values else None
+
+
+def peak_rss_mb(who: int) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024 # bytes on macOS, KiB elsewhere
+
+
+async def run(args) -> dict:
+    upstreams = Upstreams(args.latency, args.ollama_token_latency, args.ollama_tokens, args.english_ratio)
+    items = build_items({"video": args.videos, "archive": args.archives, "link": args.links, "search": args.searches},
+                        args.users)
+    for item in items:
+        if item.flow == "archive":
+            upstreams.items[f"{item.title.lower().replace(' ', '_')}_{item.year}"] = (item.title, item.year)
+    tracker = Tracker(items)
+    bot_api = FakeBotApi(args.telegram_latency, tracker.on_call)
+
+    upstream_server, bot_api_server = FakeServer(upstreams.route), FakeServer(bot_api.route)
+    await upstream_server.start()
+    await bot_api_server.start()
+    install_loopback(upstream_server.port)
+    for user in range(args.users):
+        AuthService.authorize_user(USER_BASE_ID + user, source="benchmark", first_name="Bench")
+
+    application = bot_module.build_application(base_url=f"http://127.0.0.1:{bot_api_server.port}/bot")
+    await application.initialize()
+    await bot_module.on_startup(application)
+    await application.start()
+
+    started = time.perf_counter()
+    for update_id, item in enumerate(items, start=1):
+        item.sent_at = time.perf_counter()
+        await application.update_queue.put(Update.de_json(item.update(update_id), application.bot))
+        if args.rate:
+            await asyncio.sleep(1 / args.rate)
+    try:
+        await asyncio.wait_for(tracker.finished.wait(), timeout=args.timeout)
+    except asyncio.TimeoutError:
+        print(f"Timed out after {args.timeout}s with {tracker.remaining} items unfinished.")
+    elapsed = time.perf_counter() - started
+
+    await asyncio.sleep(0.1)
+    await bot_api_server.drain()
+    await application.stop()
+    await bot_module.on_shutdown(application)
+    await application.shutdown()
+    await upstream_server.stop()
+    await bot_api_server.stop()
+
+    flows = {}
+    for flow in FLOWS + ("total",):
+        selected = [item for item in items if flow in ("total", item.flow)]
+        if not selected:
+            continue
+        latencies = [item.latency for item in selected if item.latency is not None]
+        flows[flow] = {
+            "items": len(selected),
+            "done": len(latencies),
+            "items_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95)
+        }
+    return {
+        "elapsed": elapsed,
+        "flows": flows,
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF),
+        "peak_rss_children_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+        "upstream_requests": upstreams.requests,
+        "bot_api_calls": bot_api.calls,
+        "stages": Metrics.stage_summary()
+    }
+
+
+def print_report(result: dict):
+    print(f"\n{'flow':<8} {'items':>6} {'done':>6} {'items/s':>8} {'p50':>8} {'p95':>8}")
+    for flow, row in result["flows"].items():
+        p50 = f"{row['p50']:.2f}s" if row["p50"] is not None else "-"
+        p95 = f"{row['p95']:.2f}s" if row["p95"] is not None else "-"
+        print(f"{flow:<8} {row['items']:>6} {row['done']:>6} {row['items_per_sec']:>8.2f} {p50:>8} {p95:>8}")
+    print(f"\nElapsed: {result['elapsed']:.1f}s, upstream requests: {result['upstream_requests']}, "
+          f"Bot API calls: {sum(result['bot_api_calls'].values())} {result['bot_api_calls']}")
+    print(f"Peak RSS: {result['peak_rss_mb']:.0f} MB (bot + fake servers), "
+          f"{result['peak_rss_children_mb']:.0f} MB (largest render worker)")
+
+    print(f"\n{'stage':<28} {'n':>6} {'p50':>8} {'p95':>8} {'err':>4}")
+    for row in result["stages"]:
+        print(f"{row['flow'] + '.' + row['stage']:<28} {row['count']:>6} "
+              f"{row['p50'] * 1000:>6.0f}ms {row['p95'] * 1000:>6.0f}ms {row['errors']:>4}")
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions against a previous --json result (throughput down, p95 or RSS up by more than tolerance)."""
+    regressions = []
+    for flow, row in result["flows"].items():
+        old = baseline["flows"].get(flow)
+        if not old:
+            continue
+        if row["items_per_sec"] < old["items_per_sec"] * (1 - tolerance):
+            regressions.append(f"{flow}: {row['items_per_sec']:.2f} items/s (was {old['items_per_sec']:.2f})")
+        if old["p95"] and row["p95"] and row["p95"] > old["p95"] * (1 + tolerance):
+            regressions.append(f"{flow}: p95 {row['p95']:.2f}s (was {old['p95']:.2f}s)")
+    if result["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak RSS {result['peak_rss_mb']:.0f} MB (was {baseline['peak_rss_mb']:.0f} MB)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--videos", type=int, default=40, help="forwarded videos (ingest queue flow)")
+    parser.add_argument("--archives", type=int, default=20, help="archive.org links")
+    parser.add_argument("--links", type=int, default=20, help="external 'URL | Title | Year' links")
+    parser.add_argument("--searches", type=int, default=10, help="/search commands")
+    parser.add_argument("--users", type=int, default=8, help="distinct private chats sending the updates")
+    parser.add_argument("--rate", type=float, default=0, help="updates per second (0 = all at once)")
+    parser.add_argument("--latency", type=float, default=0.05, help="TMDB/IA/image response latency (s)")
+    parser.add_argument("--telegram-latency", type=float, default=0.03, help="Bot API response latency (s)")
+    parser.add_argument("--ollama-token-latency", type=float, default=0.01, help="seconds per generated token")
+    parser.add_argument("--ollama-tokens", type=int, default=80, help="tokens per translation")
+    parser.add_argument("--english-ratio", type=float, default=0.3, help="share of titles needing translation")
+    parser.add_argument("--telegram-limits", action="store_true", help="keep the real flood-control limits")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="previous --json result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
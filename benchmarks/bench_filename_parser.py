@@ -0,0 +1,109 @@
+"""
+Filename parsing benchmark over a corpus of real-world release names
+(benchmarks/data/release_names.txt): the original parser (patterns compiled
+per call, guessit possibly run twice) vs the memoized FilenameParser (with and
+without the guessit-free fast path) and the parse_many batch API.
+Also checks that every fast-path result agrees with guessit.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_filename_parser [repeat] [processes]
+"""
+import logging
+import os
+import re
+import sys
+import time
+from guessit import guessit
+from cinegram.config import settings
+from cinegram.services.filename_parser import (
+    FilenameParser, STRATEGY_HITS, URL_RE, USERNAME_RE, _fast_parse, _parse_cached
+)
+
+CORPUS = os.path.join(os.path.dirname(__file__), "data", "release_names.txt")
+
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def legacy_parse(filename: str):
+    """FilenameParser.parse_filename before precompiled patterns and memoization."""
+    clean_name = re.sub(r'@\w+', '', filename)
+    clean_name = re.sub(r'https?://\S+|www\.\S+', '', clean_name)
+    clean_name = clean_name.replace('_', ' ')
+    data = guessit(clean_name)
+    title = data.get('title')
+    year = data.get('year')
+    if not title:
+        data_orig = guessit(filename)
+        title = data_orig.get('title')
+        year = data_orig.get('year') or year
+    if not title:
+        title = filename.rsplit('.', 1)[0].replace('.', ' ').replace('_', ' ').strip()
+    return {"title": title, "year": str(year) if year else None} if title else None
+
+
+def check_agreement(corpus) -> int:
+    """Fast path vs guessit on the same cleaned name; returns the number of disagreements."""
+    disagreements = 0
+    for name in corpus:
+        clean_name = URL_RE.sub('', USERNAME_RE.sub('', name)).replace('_', ' ')
+        fast = _fast_parse(clean_name)
+        if fast is None:
+            continue
+        data = guessit(clean_name)
+        expected = {"title": data.get('title'), "year": str(data['year']) if data.get('year') else None}
+        if fast != expected:
+            disagreements += 1
+            print(f"  disagree: {name!r} fast={fast} guessit={expected}")
+    return disagreements
+
+
+def bench(name: str, run, total: int) -> float:
+    started = time.perf_counter()
+    results = run()
+    elapsed = time.perf_counter() - started
+    print(f"{name:<24} {total / elapsed:10.0f} names/s  ({elapsed * 1000:8.1f} ms)")
+    return results
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 2)
+    logging.disable(logging.WARNING)  # Fallback strategies log a warning per name
+
+    corpus = load_corpus()
+    batch = corpus * repeat  # Forwarded batches repeat the same release names
+    print(f"{len(corpus)} release names, batch of {len(batch)} ({repeat}x)")
+
+    guessit(corpus[0])  # Warm-up: guessit builds its rebulk rules on first use
+    legacy = bench("before (legacy)", lambda: [legacy_parse(name) for name in batch], len(batch))
+
+    settings.PARSER_FAST_PATH = False
+    _parse_cached.cache_clear()
+    bench("memo, guessit only", lambda: [FilenameParser.parse_filename(name) for name in batch], len(batch))
+
+    settings.PARSER_FAST_PATH = True
+    _parse_cached.cache_clear()
+    STRATEGY_HITS.clear()
+    after = bench("memo + fast path", lambda: [FilenameParser.parse_filename(name) for name in batch], len(batch))
+    bench("warm memo", lambda: [FilenameParser.parse_filename(name) for name in batch], len(batch))
+    print(f"strategies: {FilenameParser.stats()}")
+
+    _parse_cached.cache_clear()
+    bench("parse_many", lambda: FilenameParser.parse_many(batch), len(batch))
+
+    # Force the pool even for this small corpus; start-up (spawn + guessit import per worker) is included
+    settings.PARSER_POOL_MIN_BATCH = 0
+    _parse_cached.cache_clear()
+    pooled = bench(f"parse_many ({processes} procs)", lambda: FilenameParser.parse_many(batch, processes=processes), len(batch))
+
+    mismatches = sum(1 for old, new in zip(legacy, after) if old != new)
+    mismatches += sum(1 for old, new in zip(legacy, pooled) if old != new)
+    print(f"results differing from legacy: {mismatches}")
+    print(f"fast path disagreeing with guessit: {check_agreement(corpus)}")
+
+
+if __name__ == "__main__":
+    main()
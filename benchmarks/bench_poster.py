@@ -0,0 +1,158 @@
+"""
+Poster rendering benchmark: per-poster time of the original rendering code
+(full-image LANCZOS resize, gradient drawn line by line, fonts and logo reloaded
+every time) vs PosterRenderer.
+Then the source artwork the bot downloads: bytes and decode + render time of the
+TMDB 'original' poster vs what TmdbService.get_artwork_url picks for the canvas.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_poster [iterations]
+"""
+import os
+import sys
+import time
+import textwrap
+from io import BytesIO
+from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageStat
+from cinegram.config import settings
+from cinegram.services.poster_renderer import PosterRenderer
+from cinegram.services.render_pool import render_job_timed
+from cinegram.services.tmdb_service import TmdbService
+
+TITLE = "Night of the Living Dead"
+DESCRIPTION = (
+    "Un grupo de personas se refugia en una granja aislada mientras los muertos "
+    "vuelven a la vida y rodean la casa. Entre el miedo y la desconfianza, "
+    "deberán resistir la noche para sobrevivir. " * 2
+)
+
+
+def make_source(width: int = 2000, height: int = 3000) -> Image.Image:
+    """Synthetic portrait artwork, similar in size to a TMDB 'original' poster."""
+    gradient = Image.linear_gradient("L").resize((width, height))
+    return Image.merge("RGB", (gradient, gradient.rotate(90).resize((width, height)), gradient)).convert("RGBA")
+
+
+def legacy_render(img: Image.Image, title: str, description: str) -> Image.Image:
+    """The rendering steps of ImageGenerator.generate_poster before PosterRenderer existed."""
+    target_size = settings.IMAGE_SIZE
+    img_ratio = img.width / img.height
+    target_ratio = target_size[0] / target_size[1]
+    if img_ratio > target_ratio:
+        new_height = target_size[1]
+        new_width = int(new_height * img_ratio)
+    else:
+        new_width = target_size[0]
+        new_height = int(new_width / img_ratio)
+    img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    left = (img.width - target_size[0]) / 2
+    top = (img.height - target_size[1]) / 2
+    img = img.crop((left, top, left + target_size[0], top + target_size[1]))
+
+    overlay = Image.new("RGBA", target_size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    for y in range(int(target_size[1] * 0.4), target_size[1]):
+        alpha = int(255 * ((y - target_size[1] * 0.4) / (target_size[1] * 0.6)))
+        draw.line([(0, y), (target_size[0], y)], fill=(0, 0, 0, alpha))
+    img = Image.alpha_composite(img, overlay)
+
+    draw = ImageDraw.Draw(img)
+    font_path = settings.DEFAULT_FONT_PATH
+    if not os.path.exists(font_path):
+        font_path = "arial.ttf"
+    try:
+        title_font = ImageFont.truetype(font_path, 80)
+        desc_font = ImageFont.truetype(font_path, 40)
+        wm_font = ImageFont.truetype(font_path, 60)
+    except IOError:
+        title_font = desc_font = wm_font = ImageFont.load_default()
+
+    current_y = target_size[1] - 350
+    for line in textwrap.wrap(title, width=25):
+        draw.text((100, current_y), line, font=title_font, fill="white")
+        current_y += 90
+    current_y += 20
+    clean_desc = (description[:300] + '...') if len(description) > 300 else description
+    for line in textwrap.wrap(clean_desc, width=70)[:6]:
+        draw.text((100, current_y), line, font=desc_font, fill=(200, 200, 200))
+        current_y += 50
+
+    logo_path = os.path.join(settings.ASSETS_DIR, "logo", "logo.png")
+    if os.path.exists(logo_path):
+        logo = Image.open(logo_path).convert("RGBA")
+        logo = logo.resize((300, int(300 * logo.height / logo.width)), Image.Resampling.LANCZOS)
+        img.paste(logo, (target_size[0] - 300 - 50, 50), logo)
+    else:
+        wm_bbox = draw.textbbox((0, 0), "CINEGRAM 🎬", font=wm_font)
+        wm_x = target_size[0] - (wm_bbox[2] - wm_bbox[0]) - 50
+        draw.text((wm_x + 3, 53), "CINEGRAM 🎬", font=wm_font, fill="black")
+        draw.text((wm_x, 50), "CINEGRAM 🎬", font=wm_font, fill=(255, 215, 0))
+    return img.convert("RGB")
+
+
+def make_jpeg(width: int, height: int) -> bytes:
+    """Photo-like JPEG of the given size (noise keeps the file size realistic)."""
+    noise = Image.effect_noise((width, height), 40)
+    img = Image.merge("RGB", (noise, Image.linear_gradient("L").resize((width, height)), noise))
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def bench_source(name: str, jpeg: bytes, iterations: int) -> float:
+    size = tuple(settings.IMAGE_SIZE)
+    render_job_timed(jpeg, TITLE, DESCRIPTION, size)  # Warm-up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        render_job_timed(jpeg, TITLE, DESCRIPTION, size)
+    per_poster = (time.perf_counter() - started) / iterations * 1000
+    print(f"{name:<26} {len(jpeg) / 1024:8.0f} KB {per_poster:8.1f} ms/poster")
+    return per_poster
+
+
+def encode(img: Image.Image) -> bytes:
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def bench(name: str, render, source: Image.Image, iterations: int) -> float:
+    render(source, TITLE, DESCRIPTION)  # Warm-up (first call builds caches)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        encode(render(source, TITLE, DESCRIPTION))
+    per_poster = (time.perf_counter() - started) / iterations * 1000
+    print(f"{name:<16} {per_poster:8.1f} ms/poster")
+    return per_poster
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    source = make_source()
+    print(f"Rendering {iterations} posters at {settings.IMAGE_SIZE[0]}x{settings.IMAGE_SIZE[1]} (incl. JPEG q95 encode)")
+
+    before = bench("before (legacy)", legacy_render, source, iterations)
+    after = bench("after (cached)", PosterRenderer.get().render, source, iterations)
+    print(f"speedup          {before / after:8.2f}x")
+
+    # Both paths must produce the same picture (only sub-pixel resampling differences allowed)
+    diff = ImageChops.difference(
+        legacy_render(source, TITLE, DESCRIPTION),
+        PosterRenderer.get().render(source, TITLE, DESCRIPTION)
+    )
+    mean_diff = sum(ImageStat.Stat(diff).mean) / 3
+    print(f"mean pixel diff  {mean_diff:8.3f} (0-255)")
+
+    # Source artwork: typical TMDB dimensions ('original' poster 2000x3000, w1280 backdrop 1280x720)
+    picked = TmdbService.get_artwork_url({"poster_path": "/poster.jpg", "backdrop_path": "/backdrop.jpg"})
+    print(f"\nSource artwork (bytes to download, decode + render), picked for this canvas: {picked}")
+    original = make_jpeg(2000, 3000)
+    backdrop = make_jpeg(1280, 720)
+    before = bench_source("poster original 2000x3000", original, iterations)
+    after = bench_source("backdrop w1280 1280x720", backdrop, iterations)
+    print(f"bytes            {len(original) / len(backdrop):8.2f}x smaller")
+    print(f"decode + render  {before / after:8.2f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Startup benchmark, each sample in a fresh interpreter:
+- time to import cinegram.bot (lazy Pillow/guessit) vs the same import plus the
+  modules it used to pull in eagerly (guessit, Pillow, the poster renderer);
+- latency of the first filename that needs guessit, cold vs after
+  FilenameParser.warm_up() (what the background warm-up does at startup).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+EAGER_IMPORTS = "import guessit, PIL.Image, cinegram.services.poster_renderer; "
+# Not a 'Title.Year.Tags' shape, so the fast path hands it to guessit
+GUESSIT_NAME = "Night of the Living Dead - Director's Cut [Spanish].mkv"
+
+
+def sample(code: str) -> float:
+    """Runs code in a new interpreter; the code prints one duration in seconds."""
+    env = {**os.environ, "CACHE_DIR": tempfile.gettempdir(), "PYTHONDONTWRITEBYTECODE": "1"}
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def median_ms(code: str, runs: int) -> float:
+    return statistics.median(sample(code) for _ in range(runs)) * 1000
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    timed = "import time; t = time.perf_counter(); {body}; print(time.perf_counter() - t)"
+
+    lazy = median_ms(timed.format(body="import cinegram.bot"), runs)
+    eager = median_ms(timed.format(body=EAGER_IMPORTS + "import cinegram.bot"), runs)
+    print(f"import cinegram.bot:        {lazy:7.0f} ms (median of {runs})")
+    print(f"  with the eager imports:   {eager:7.0f} ms ({eager - lazy:+.0f} ms)")
+
+    parse = f"FilenameParser.parse_filename({GUESSIT_NAME!r})"
+    setup = "from cinegram.services.filename_parser import FilenameParser; "
+    cold = median_ms(setup + timed.format(body=parse), runs)
+    warm = median_ms(setup + "FilenameParser.warm_up(); " + timed.format(body=parse), runs)
+    print(f"first guessit parse, cold:  {cold:7.0f} ms")
+    print(f"  after warm_up():          {warm:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
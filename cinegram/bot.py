@@ -1,29 +1,133 @@
+import time
+STARTED = time.perf_counter() # Startup report baseline, taken before the heavy imports
+import asyncio
 import os
 import logging
+from typing import Optional
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ConversationHandler, CallbackQueryHandler
 from cinegram.config import settings
-from cinegram.handlers import start, archive_handler, video_handler, external_handler, search_handler, auth_handler
+from cinegram.handlers import start, archive_handler, video_handler, external_handler, search_handler, auth_handler, stats_handler
 from telegram.ext import PreCheckoutQueryHandler, MessageHandler, filters
+from cinegram.services.http_client import HttpClient
+from cinegram.services.render_pool import RenderPool
+from cinegram.services.ingest_queue import IngestQueue
+from cinegram.services.send_scheduler import SendScheduler
+from cinegram.services.update_processor import ChatOrderedUpdateProcessor
+from cinegram.services.auth_service import AuthService
+from cinegram.services.metrics import Metrics
+from cinegram.services.tmdb_service import TmdbService
+from cinegram.services.translation_service import TranslationService
+from cinegram.services.archive_service import ArchiveService
+from cinegram.services.filename_parser import FilenameParser
+from cinegram.utils import helpers
+IMPORTED = time.perf_counter()
 
 # Configure Logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
 )
+logger = logging.getLogger(__name__)
 
-def main():
-    if not settings.BOT_TOKEN:
-        print("Error: BOT_TOKEN not found in environment variables.")
-        return
+async def warm_up(context):
+    """
+    Pays the one-time costs off the first update's path, once the application is running:
+    guessit's import and rule compilation (in a thread) and the render workers with their fonts.
+    """
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        asyncio.to_thread(FilenameParser.warm_up),
+        RenderPool.warm_up(),
+        return_exceptions=True
+    )
+    for error in results:
+        if isinstance(error, Exception):
+            logger.warning(f"Warm-up step failed: {error}")
+    Metrics.observe("startup", "warm_up", time.perf_counter() - started)
+    logger.info(f"Warm-up done in {(time.perf_counter() - started) * 1000:.0f} ms.")
+
+async def on_startup(application):
+    """Starts background workers once the bot is initialized and reports the startup time."""
+    IngestQueue.start(application.bot, video_handler.process_video_job, video_handler.prefetch_video_jobs)
+    if settings.METRICS_PORT:
+        await Metrics.start_server()
+
+    ready = time.perf_counter()
+    Metrics.observe("startup", "imports", IMPORTED - STARTED)
+    Metrics.observe("startup", "ready", ready - STARTED)
+    logger.info(
+        f"Startup: imports {(IMPORTED - STARTED) * 1000:.0f} ms, "
+        f"ready after {(ready - STARTED) * 1000:.0f} ms (Bot API handshake included)."
+    )
+    if settings.STARTUP_WARMUP and application.job_queue:
+        application.job_queue.run_once(warm_up, when=0, name="warm_up") # Runs once the application has started
+
+async def on_shutdown(application):
+    """Releases shared resources (ingest workers, metrics endpoint, HTTP connection pool, render workers)."""
+    await IngestQueue.stop()
+    await Metrics.stop_server()
+    await HttpClient.close()
+    RenderPool.shutdown()
+
+async def temp_janitor(context):
+    """Periodically trims the temp dir (posters written in file mode)."""
+    removed = helpers.clean_temp_dir(settings.TEMP_DIR, settings.TEMP_MAX_FILES, settings.TEMP_MAX_AGE)
+    if removed:
+        logger.info(f"Temp janitor removed {removed} files.")
+
+async def whitelist_watcher(context):
+    """Picks up changes made to the user database outside the bot (cheap data_version check)."""
+    AuthService.reload_if_changed()
+
+def register_gauges(scheduler: SendScheduler, processor: ChatOrderedUpdateProcessor):
+    """Queue depths and cache hit rates, read when /metrics or /stats is requested."""
+    Metrics.register_gauge("ingest_jobs", IngestQueue.status_counts, label="status")
+    Metrics.register_gauge("send_queue_depth", lambda: scheduler.stats()["queue_depth"], label="priority")
+    Metrics.register_gauge("updates_in_flight", lambda: processor.stats()["in_flight"])
+    Metrics.register_gauge("chats_waiting", lambda: processor.stats()["chats_waiting"])
+    Metrics.register_gauge("cache_hit_rate", lambda: {
+        "tmdb": TmdbService.cache.stats()["hit_rate"],
+        "translations": TranslationService.cache.stats()["hit_rate"],
+        "ia_items": ArchiveService.item_cache.stats()["hit_rate"]
+    }, label="cache")
 
-    application = ApplicationBuilder().token(settings.BOT_TOKEN).build()
+def build_application(base_url: Optional[str] = None):
+    """
+    Creates the Application with every handler registered (main() runs it; the end-to-end
+    benchmark drives it directly). base_url points the bot at another Bot API endpoint.
+    """
+    scheduler = SendScheduler()
+    processor = ChatOrderedUpdateProcessor(settings.UPDATE_CONCURRENCY)
+    register_gauges(scheduler, processor)
+
+    builder = (
+        ApplicationBuilder()
+        .token(settings.BOT_TOKEN)
+        .rate_limiter(scheduler) # Every Bot API call goes through the global/per-chat limits
+        .concurrent_updates(processor) # Chats don't wait for each other
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+    )
+    if settings.BOT_API_BASE_URL:
+        # Self-hosted Bot API server: uploads up to 2000 MB; in local mode files are passed by path
+        builder = (
+            builder
+            .base_url(settings.BOT_API_BASE_URL)
+            .base_file_url(settings.BOT_API_BASE_FILE_URL)
+            .local_mode(settings.BOT_API_LOCAL_MODE)
+            .media_write_timeout(600)
+        )
+    elif base_url:
+        builder = builder.base_url(base_url)
+    application = builder.build()
 
     # --- Auth Handlers (Public/Gatekeeper) ---
     application.add_handler(PreCheckoutQueryHandler(auth_handler.precheckout_callback))
     application.add_handler(MessageHandler(filters.SUCCESSFUL_PAYMENT, auth_handler.successful_payment_callback))
     
-    # Password Handler (Explicitly check text)
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, auth_handler.handle_password), group=0)
+    # Password Handler (Explicitly check text). Runs before group 0: authorized users fall
+    # through to the link handlers, other users' text stops here.
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, auth_handler.handle_password), group=-1)
 
     # --- Protected Handlers ---
     # We wrap them with auth_handler.auth_required
@@ -37,6 +141,10 @@ def main():
     
     # Video Flow
     application.add_handler(MessageHandler(filters.VIDEO | filters.Document.VIDEO, auth_handler.auth_required(video_handler.video_entry)))
+    application.add_handler(CommandHandler("queue", auth_handler.auth_required(video_handler.queue_command)))
+
+    # Metrics (admin)
+    application.add_handler(CommandHandler("stats", auth_handler.auth_required(stats_handler.stats_command)))
 
     # Archive Links
     application.add_handler(MessageHandler(filters.Regex(r'archive\.org/details/'), auth_handler.auth_required(archive_handler.handle_archive_link)))
@@ -44,8 +152,33 @@ def main():
     # Generic Links
     application.add_handler(MessageHandler(filters.Entity("url") | filters.Regex(r'^http'), auth_handler.auth_required(external_handler.handle_external_link)))
 
-    print("Bot is running...")
-    application.run_polling()
+    # Housekeeping
+    if application.job_queue:
+        application.job_queue.run_repeating(temp_janitor, interval=600, first=60)
+        application.job_queue.run_repeating(whitelist_watcher, interval=30, first=30)
+
+    return application
+
+def main():
+    if not settings.BOT_TOKEN:
+        print("Error: BOT_TOKEN not found in environment variables.")
+        return
+
+    application = build_application()
+    if settings.WEBHOOK_URL:
+        # Webhook mode: built-in HTTP server; Telegram pushes updates (requests carry the secret token)
+        print(f"Bot is running (webhook on port {settings.WEBHOOK_PORT})...")
+        application.run_webhook(
+            listen=settings.WEBHOOK_LISTEN,
+            port=settings.WEBHOOK_PORT,
+            url_path=settings.WEBHOOK_PATH,
+            webhook_url=f"{settings.WEBHOOK_URL.rstrip('/')}/{settings.WEBHOOK_PATH}",
+            secret_token=settings.WEBHOOK_SECRET,
+            max_connections=min(100, settings.UPDATE_CONCURRENCY)
+        )
+    else:
+        print("Bot is running...")
+        application.run_polling()
 
 if __name__ == '__main__':
     main()
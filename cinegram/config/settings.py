@@ -1,4 +1,5 @@
 import os
+import secrets
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,15 +16,111 @@ ADMIN_ID = int(os.getenv("ADMIN_ID", "0")) # Owner ID
 ACCESS_PASSWORD = os.getenv("ACCESS_PASSWORD", "cinegram123") # Fallback password
 STARS_PRICE = 50 # Cost in Stars to unlock
 
+# Update Delivery
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "") # Public HTTPS base URL (e.g. https://bot.example.com); empty = long polling
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or secrets.token_urlsafe(32) # X-Telegram-Bot-Api-Secret-Token
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "32")) # Max in-flight updates (same chat stays ordered)
+
+# Metrics (Prometheus text on METRICS_HOST:METRICS_PORT/metrics, admin /stats command)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108")) # 0 = no HTTP endpoint
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_WINDOW = 1000 # Recent samples per stage used for percentiles
+
+# Startup
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1") == "1" # Load guessit rules, render workers and fonts in the background
+
+# Self-hosted Bot API server (github.com/tdlib/telegram-bot-api); empty = cloud Bot API (50 MB uploads)
+BOT_API_BASE_URL = os.getenv("BOT_API_BASE_URL", "") # e.g. http://localhost:8081/bot
+BOT_API_BASE_FILE_URL = os.getenv("BOT_API_BASE_FILE_URL", "") # Default: BOT_API_BASE_URL with /bot -> /file/bot
+if BOT_API_BASE_URL and not BOT_API_BASE_FILE_URL and BOT_API_BASE_URL.endswith("/bot"):
+    BOT_API_BASE_FILE_URL = BOT_API_BASE_URL[:-len("/bot")] + "/file/bot"
+BOT_API_LOCAL_MODE = os.getenv("BOT_API_LOCAL_MODE", "0") == "1" # Server runs with --local and can read UPLOAD_DIR
+BOT_API_MAX_UPLOAD_BYTES = int(os.getenv("BOT_API_MAX_UPLOAD_MB", "2000")) * 1024 * 1024 # Self-hosted server limit
+
+# HTTP Client (shared async connection pool)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "10")) # Max in-flight requests per upstream
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") == "1" # Used only if 'h2' is installed
+
 # Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TEMP_DIR = os.path.join(BASE_DIR, "temp")
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 FONTS_DIR = os.path.join(ASSETS_DIR, "fonts")
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(BASE_DIR, "cache"))
+USERS_DB_PATH = os.getenv("USERS_DB_PATH", os.path.join(ASSETS_DIR, "users.sqlite3")) # Users, payments, entitlements
+CATALOG_DB_PATH = os.getenv("CATALOG_DB_PATH", os.path.join(ASSETS_DIR, "catalog.sqlite3")) # Published posts (deduplication)
 
-# Make sure temp directory exists
+# Make sure temp/cache directories exist
 os.makedirs(TEMP_DIR, exist_ok=True)
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+# Caches (TTLs in seconds)
+TMDB_CACHE_TTL = int(os.getenv("TMDB_CACHE_TTL", str(7 * 24 * 3600)))
+TMDB_NEGATIVE_TTL = int(os.getenv("TMDB_NEGATIVE_TTL", str(6 * 3600))) # "Not found" results expire sooner
+TMDB_CACHE_MEMORY_SIZE = int(os.getenv("TMDB_CACHE_MEMORY_SIZE", "2048"))
+TRANSLATION_CACHE_TTL = int(os.getenv("TRANSLATION_CACHE_TTL", str(90 * 24 * 3600)))
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "50000"))
+IA_SEARCH_CACHE_TTL = int(os.getenv("IA_SEARCH_CACHE_TTL", str(6 * 3600)))
+IA_ITEM_CACHE_TTL = int(os.getenv("IA_ITEM_CACHE_TTL", str(24 * 3600)))
+
+# Internet Archive Search
+IA_SEARCH_PAGE_SIZE = 5 # Results per inline keyboard page
+IA_SEARCH_BATCH = 100 # Items per scrape API request (API minimum)
+
+# Translation (Ollama)
+TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "2")) # Parallel LLM requests
+TRANSLATION_STREAM = os.getenv("TRANSLATION_STREAM", "1") == "1" # Consume tokens incrementally
+TRANSLATION_TIME_BUDGET = float(os.getenv("TRANSLATION_TIME_BUDGET", "20")) # Max seconds per synopsis
+TRANSLATION_MAX_LINES = 6
+TRANSLATION_MAX_CHARS = 420 # ~6 poster lines of 70 chars
+
+# Telegram Send Limits (Bot API flood control)
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "25")) # Messages/sec across all chats (hard limit ~30)
+TG_PRIVATE_CHAT_RATE = float(os.getenv("TG_PRIVATE_CHAT_RATE", "1")) # Messages/sec per user chat
+TG_GROUP_CHAT_PER_MINUTE = float(os.getenv("TG_GROUP_CHAT_PER_MINUTE", "20")) # Per group/channel
+TG_MAX_RETRIES = int(os.getenv("TG_MAX_RETRIES", "5")) # Retries after RetryAfter before giving up
+TG_URL_VIDEO_MAX_BYTES = 20 * 1024 * 1024 # Bot API limit for files sent by URL (other than photos)
+
+# Filename Parsing
+PARSER_CACHE_SIZE = int(os.getenv("PARSER_CACHE_SIZE", "4096")) # Memoized filenames
+PARSER_FAST_PATH = os.getenv("PARSER_FAST_PATH", "1") == "1" # Skip guessit for plain 'Title.Year.Tags' names
+PARSER_POOL_MIN_BATCH = 200 # parse_many only uses a process pool from this many unique names
+
+# Video Ingest Queue
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4")) # Videos processed at the same time
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+INGEST_RETRY_DELAY = int(os.getenv("INGEST_RETRY_DELAY", "30")) # Seconds, doubled on every retry
+INGEST_STAGE_LIMITS = { # Max jobs inside each pipeline stage at once
+    "parse": int(os.getenv("INGEST_PARSE_LIMIT", "2")),
+    "tmdb": int(os.getenv("INGEST_TMDB_LIMIT", "4")),
+    "render": int(os.getenv("INGEST_RENDER_LIMIT", "2")),
+    "publish": int(os.getenv("INGEST_PUBLISH_LIMIT", "1")),
+}
+INGEST_PREFETCH_BATCH = int(os.getenv("INGEST_PREFETCH_BATCH", "20")) # Queued videos looked up/translated together (0 = off)
+INGEST_PREFETCH_DELAY = float(os.getenv("INGEST_PREFETCH_DELAY", "1")) # Seconds to let a forwarded burst pile up
 
 # Image Generation Defaults
 DEFAULT_FONT_PATH = os.path.join(FONTS_DIR, "Roboto-Bold.ttf") # User needs to provide this or we fallback
 IMAGE_SIZE = (1920, 1080)
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(min(4, os.cpu_count() or 1)))) # 0 = background thread
+RENDER_QUEUE_LIMIT = int(os.getenv("RENDER_QUEUE_LIMIT", str(max(1, RENDER_WORKERS) * 2))) # Queued + running renders
+POSTER_OUTPUT_MODE = os.getenv("POSTER_OUTPUT_MODE", "memory") # "memory" (no disk I/O) or "file" (TEMP_DIR)
+TEMP_MAX_FILES = int(os.getenv("TEMP_MAX_FILES", "200")) # Janitor limits for file mode
+TEMP_MAX_AGE = int(os.getenv("TEMP_MAX_AGE", "3600"))
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(20 * 1024 * 1024))) # Source artwork download cap
+POSTER_MAX_UPSCALE = float(os.getenv("POSTER_MAX_UPSCALE", "1.5")) # >1 lets smaller TMDB sizes be upscaled (1920x1080 -> w1280 backdrop)
+POSTER_CACHE_MAX_MB = int(os.getenv("POSTER_CACHE_MAX_MB", "500")) # Rendered posters (disk LRU)
+ARTWORK_CACHE_MAX_MB = int(os.getenv("ARTWORK_CACHE_MAX_MB", "1000")) # Downloaded source images (disk LRU)
+
+# Large Uploads (self-hosted Bot API server only)
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", TEMP_DIR) # Videos downloaded before upload (shared with the server in local mode)
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "2")) # Simultaneous multi-GB transfers
+UPLOAD_CHUNK_SIZE = 1024 * 1024 # Bytes per read/write: memory stays bounded whatever the file size
+UPLOAD_PROGRESS_INTERVAL = 5 # Seconds between progress message edits
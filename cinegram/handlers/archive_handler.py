@@ -1,10 +1,15 @@
+import asyncio
 from telegram import Update
 from telegram.ext import ContextTypes
 from cinegram.utils import helpers
 from cinegram.services.archive_service import ArchiveService
 from cinegram.services.metadata_parser import MetadataParser
 from cinegram.services.image_generator import ImageGenerator
-from cinegram.handlers.publish_handler import send_publication
+from cinegram.services.tmdb_service import TmdbService
+from cinegram.services.pipeline import Pipeline
+from cinegram.services.metrics import Metrics
+from cinegram.services.catalog import PublishedCatalog
+from cinegram.handlers.publish_handler import already_published_text, send_publication
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,7 +35,6 @@ async def process_archive_item(update: Update, context: ContextTypes.DEFAULT_TYP
 
     # Reply target: Message or Callback Message
     message = update.message or update.callback_query.message
-    await message.reply_text("🔍 Fetching metadata...")
 
     # 2. Extract Identifier
     identifier = helpers.extract_identifier(url)
@@ -38,55 +42,117 @@ async def process_archive_item(update: Update, context: ContextTypes.DEFAULT_TYP
         await message.reply_text("❌ Could not extract identifier from URL.")
         return
 
-    # 3. Fetch Metadata
-    data = ArchiveService.get_metadata(identifier)
-    if not data:
+    # Already published in this chat: answer before any IA/TMDB request
+    post = PublishedCatalog.find(message.chat_id, PublishedCatalog.keys(ia_identifier=identifier))
+    if post:
+        await message.reply_text(already_published_text(post))
+        return
+
+    # 3-6. Enrichment DAG: independent stages run concurrently
+    #   metadata ─┬─ tmdb ─┬─ published ─┐
+    #             │        └─ merge ─────┴─ poster
+    #             └─ ia_artwork (speculative prefetch of the IA fallback image)
+    pipeline = Pipeline(f"archive:{identifier}")
+
+    async def notify_fetch():
+        await message.reply_text("🔍 Fetching metadata...")
+
+    async def fetch_metadata():
+        return await ArchiveService.get_item(identifier)
+
+    async def search_tmdb(data):
+        # Try to find title/year from IA data first to search TMDB
+        if not data:
+            return None
+        ia_title = data.get('metadata', {}).get('title')
+        ia_date = data.get('metadata', {}).get('date', '')[:4]
+        if not ia_title:
+            return None
+        _, tmdb_data = await asyncio.gather(
+            message.reply_text(f"🎬 Searching TMDB for: {ia_title}..."),
+            TmdbService.search_movie(ia_title, ia_date)
+        )
+        return tmdb_data
+
+    async def prefetch_ia_artwork(data):
+        # Only used if TMDB has no poster, but downloading it now takes it off the critical path
+        ia_metadata = MetadataParser.parse(data)
+        if ia_metadata and ia_metadata.get('poster_url'):
+            await ImageGenerator.load_artwork(ia_metadata['poster_url'])
+
+    async def merge(data, tmdb_data):
+        # Parse Metadata (Merge IA + TMDB)
+        return MetadataParser.parse(data, tmdb_data)
+
+    async def find_published(tmdb_data):
+        # Same movie published from another item: no poster render
+        if not tmdb_data:
+            return None
+        return PublishedCatalog.find(message.chat_id, PublishedCatalog.keys(tmdb_id=tmdb_data.get('id')))
+
+    async def render_poster(metadata, tmdb_data, published):
+        if published or not metadata or not metadata.get('poster_url'):
+            pipeline.cancel("ia_artwork")
+            return None
+        if tmdb_data and tmdb_data.get('poster_path'):
+            pipeline.cancel("ia_artwork") # TMDB poster wins, the fallback is not needed
+        else:
+            await pipeline.result("ia_artwork")
+
+        try:
+            _, poster = await asyncio.gather(
+                message.reply_text("🎨 Generating poster..."),
+                ImageGenerator.generate_poster(metadata['poster_url'], metadata['title'], metadata['description'])
+            )
+            return poster
+        except Exception as e:
+            logger.error(f"Image generation failed: {e}")
+            return None
+
+    pipeline.add("notify", notify_fetch)
+    pipeline.add("metadata", fetch_metadata)
+    pipeline.add("tmdb", search_tmdb, depends_on=["metadata"])
+    pipeline.add("ia_artwork", prefetch_ia_artwork, depends_on=["metadata"])
+    pipeline.add("merge", merge, depends_on=["metadata", "tmdb"])
+    pipeline.add("published", find_published, depends_on=["tmdb"])
+    pipeline.add("poster", render_poster, depends_on=["merge", "tmdb", "published"])
+    results = await pipeline.run()
+
+    if not results['metadata']:
         await message.reply_text("❌ Failed to fetch data from Internet Archive.")
         return
 
-    # 4. Enhance with TMDB (Optional)
-    from cinegram.services.tmdb_service import TmdbService
-    tmdb_data = None
-    
-    # Try to find title/year from IA data first to search TMDB
-    ia_title = data.get('metadata', {}).get('title')
-    ia_date = data.get('metadata', {}).get('date', '')[:4]
-    
-    if ia_title:
-        await message.reply_text(f"🎬 Searching TMDB for: {ia_title}...")
-        tmdb_data = TmdbService.search_movie(ia_title, ia_date)
+    if results['published']:
+        PublishedCatalog.add_keys(results['published'], PublishedCatalog.keys(ia_identifier=identifier))
+        await message.reply_text(already_published_text(results['published']))
+        return
 
-    # 5. Parse Metadata (Merge IA + TMDB)
-    metadata = MetadataParser.parse(data, tmdb_data)
+    metadata = results['merge']
     if not metadata:
         await message.reply_text("❌ Could not parse metadata.")
         return
 
-    # Add video link (simple construction)
-    metadata['video_link'] = f"https://archive.org/details/{identifier}"
-    
-    # 6. Generate Image
-    await message.reply_text("🎨 Generating poster...")
-    try:
-        if metadata.get('poster_url'):
-            image_path = ImageGenerator.generate_poster(
-                metadata['poster_url'],
-                metadata['title'],
-                metadata['description']
-            )
-        else:
-            await message.reply_text("⚠️ No cover image found to generate poster.")
-            return
-    except Exception as e:
-        logger.error(f"Image generation failed: {e}")
+    if not metadata.get('poster_url'):
+        await message.reply_text("⚠️ No cover image found to generate poster.")
+        return
+
+    poster = results['poster']
+    if not poster:
         await message.reply_text("❌ Image generation failed.")
         return
 
+    # Add video link (simple construction)
+    metadata['video_link'] = f"https://archive.org/details/{identifier}"
+
     # 7. Publish
     await message.reply_text("📤 Publishing...")
     
     # send_publication expects 'update' to get chat_id. 
     # Use helper that can handle both or extraction?
     # send_publication uses `update.effective_chat.id` which works for both Message and CallbackQuery updates.
-    await send_publication(update, context, metadata, image_path)
-
+    with Metrics.timer("archive", "publish"):
+        post = await send_publication(update, context, metadata, poster)
+    tmdb_id = results['tmdb'].get('id') if results['tmdb'] else None
+    PublishedCatalog.record(
+        post, metadata['title'], metadata['year'], PublishedCatalog.keys(tmdb_id=tmdb_id, ia_identifier=identifier)
+    )
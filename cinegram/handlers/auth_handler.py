@@ -1,5 +1,5 @@
 from telegram import Update, LabeledPrice, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes
+from telegram.ext import ApplicationHandlerStop, ContextTypes
 from cinegram.services.auth_service import AuthService
 from cinegram.config import settings
 from functools import wraps
@@ -60,12 +60,14 @@ async def handle_password(update: Update, context: ContextTypes.DEFAULT_TYPE):
         pass
 
     if text == settings.ACCESS_PASSWORD:
-        AuthService.authorize_user(user_id)
+        user = update.effective_user
+        AuthService.authorize_user(user_id, source="password", first_name=user.first_name, username=user.username)
         await update.message.reply_text("✅ **¡Acceso Concedido!**\nBienvenido a CineGram. Usa /start para comenzar.")
     else:
         # Optional: Don't reply to everything to avoid spam, or reply generic.
         # But for password attempt, we should reply.
         await update.message.reply_text("❌ Contraseña incorrecta.")
+    raise ApplicationHandlerStop # Not authorized yet: the protected handlers must not run for this text
 
 # --- Payment Handlers ---
 
@@ -79,6 +81,9 @@ async def precheckout_callback(update: Update, context: ContextTypes.DEFAULT_TYP
 
 async def successful_payment_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Confirms successful payment."""
-    user_id = update.effective_user.id
-    AuthService.authorize_user(user_id)
+    user = update.effective_user
+    payment_id = AuthService.record_payment(user.id, update.message.successful_payment)
+    AuthService.authorize_user(
+        user.id, source="stars", payment_id=payment_id, first_name=user.first_name, username=user.username
+    )
     await update.message.reply_text("🌟 **¡Pago Recibido!**\n\nTu acceso ha sido desbloqueado permanentemente. ¡Disfruta CineGram!")
@@ -2,7 +2,9 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from cinegram.services.tmdb_service import TmdbService
 from cinegram.services.image_generator import ImageGenerator
-from cinegram.handlers.publish_handler import send_publication
+from cinegram.services.metrics import Metrics
+from cinegram.services.catalog import PublishedCatalog
+from cinegram.handlers.publish_handler import already_published_text, send_publication
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,13 +29,28 @@ async def handle_external_link(update: Update, context: ContextTypes.DEFAULT_TYP
     url = parts[0]
     title = parts[1]
     year = parts[2] if len(parts) > 2 else ""
-    
+
+    # Same link already published in this chat: answer before any TMDB request
+    chat_id = update.effective_chat.id
+    post = PublishedCatalog.find(chat_id, PublishedCatalog.keys(url=url))
+    if post:
+        await update.message.reply_text(already_published_text(post))
+        return
+
     await update.message.reply_text(f"🔍 Processing: {title} ({year})...")
 
     # 1. Enhance with TMDB
     tmdb_data = None
     if title:
-        tmdb_data = TmdbService.search_movie(title, year)
+        with Metrics.timer("external", "tmdb"):
+            tmdb_data = await TmdbService.search_movie(title, year)
+
+    # Same movie already published (from another link): skip the render
+    post = PublishedCatalog.find(chat_id, PublishedCatalog.keys(tmdb_id=tmdb_data.get('id') if tmdb_data else None))
+    if post:
+        PublishedCatalog.add_keys(post, PublishedCatalog.keys(url=url))
+        await update.message.reply_text(already_published_text(post))
+        return
 
     # 2. Construct Metadata
     # Defaults
@@ -48,7 +65,7 @@ async def handle_external_link(update: Update, context: ContextTypes.DEFAULT_TYP
             year = tmdb_data.get('release_date')[:4] or year
         description = tmdb_data.get('overview') or description
         if tmdb_data.get('poster_path'):
-            poster_url = TmdbService.get_poster_url(tmdb_data.get('poster_path'))
+            poster_url = TmdbService.get_artwork_url(tmdb_data)
         if tmdb_data.get('genre_ids'):
             genre = TmdbService.get_genres(tmdb_data['genre_ids'])
         if tmdb_data.get('vote_average'):
@@ -68,25 +85,26 @@ async def handle_external_link(update: Update, context: ContextTypes.DEFAULT_TYP
     # 3. Generate Image
     await update.message.reply_text("🎨 Generating poster...")
     try:
-        if metadata.get('poster_url'):
-            image_path = ImageGenerator.generate_poster(
-                metadata['poster_url'],
-                metadata['title'],
-                metadata['description']
-            )
-        else:
-            # TODO: Add logic to generate text-only poster if no image found?
-            # For now, just warn.
-            await update.message.reply_text("⚠️ No poster found on TMDB. Using placeholder?")
-            # We could add a 'generate_text_poster' method, but for now let's rely on fallback or error.
-            # actually ImageGenerator handles invalid URL by making a black placeholder, 
-            # but we need a URL to trigger it.
-            # Let's give it a dummy if none found so it makes a title card.
-            image_path = ImageGenerator.generate_poster(
-                "https://dummyimage.com/1920x1080/000/fff&text=No+Image", 
-                metadata['title'], 
-                metadata['description']
-            )
+        with Metrics.timer("external", "poster"):
+            if metadata.get('poster_url'):
+                poster = await ImageGenerator.generate_poster(
+                    metadata['poster_url'],
+                    metadata['title'],
+                    metadata['description']
+                )
+            else:
+                # TODO: Add logic to generate text-only poster if no image found?
+                # For now, just warn.
+                await update.message.reply_text("⚠️ No poster found on TMDB. Using placeholder?")
+                # We could add a 'generate_text_poster' method, but for now let's rely on fallback or error.
+                # actually ImageGenerator handles invalid URL by making a black placeholder, 
+                # but we need a URL to trigger it.
+                # Let's give it a dummy if none found so it makes a title card.
+                poster = await ImageGenerator.generate_poster(
+                    "https://dummyimage.com/1920x1080/000/fff&text=No+Image", 
+                    metadata['title'], 
+                    metadata['description']
+                )
 
     except Exception as e:
         logger.error(f"Image generation failed: {e}")
@@ -95,4 +113,9 @@ async def handle_external_link(update: Update, context: ContextTypes.DEFAULT_TYP
 
     # 4. Publish
     await update.message.reply_text("📤 Publishing...")
-    await send_publication(update, context, metadata, image_path)
+    with Metrics.timer("external", "publish"):
+        post = await send_publication(update, context, metadata, poster)
+    PublishedCatalog.record(
+        post, metadata['title'], metadata['year'],
+        PublishedCatalog.keys(tmdb_id=tmdb_data.get('id') if tmdb_data else None, url=url)
+    )
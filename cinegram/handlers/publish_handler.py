@@ -1,21 +1,52 @@
-import os
+import asyncio
+import logging
+import time
+from typing import Dict, Union
+import httpx
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import TelegramError
 from telegram.ext import ContextTypes
 from cinegram.config import settings
+from cinegram.services.image_generator import ImageGenerator
+from cinegram.services.large_upload import LargeUpload, UploadProgress
 
-async def send_publication(update: Update, context: ContextTypes.DEFAULT_TYPE, metadata: dict, image_path: str):
+logger = logging.getLogger(__name__)
+
+async def upload_with_progress(bot, chat_id, source: str, **kwargs):
+    """Streams a large video through the self-hosted Bot API server, editing a progress message meanwhile."""
+    status = await bot.send_message(chat_id=chat_id, text="⬇️ Preparando video...")
+    progress = UploadProgress()
+    reporter = asyncio.create_task(progress.report(status.edit_text))
+    try:
+        return await LargeUpload.send_video(bot, chat_id, source, progress, **kwargs)
+    finally:
+        reporter.cancel()
+        try:
+            await status.delete()
+        except TelegramError:
+            pass
+
+def already_published_text(post: Dict) -> str:
+    """Reply for a duplicate: points to the earlier post (t.me link for channels and supergroups)."""
+    published = time.strftime("%d/%m/%Y", time.localtime(post['published_at']))
+    text = f"♻️ Ya publicado: {post['title']} ({post['year']}) el {published}."
+    if post.get('link'):
+        text += f"\n🔗 {post['link']}"
+    return text
+
+async def send_publication(update: Update, context: ContextTypes.DEFAULT_TYPE, metadata: dict, poster: Union[bytes, str]):
     """
     Orchestrates the 2-step publication process.
     1. Send Generated Image (No Caption)
-    2. Send Video (with Caption + Inline Button)
+    2. Send Video by URL (with Caption + Inline Button), or the Archive.org link if there is no suitable file
+    Returns the captioned post (the Message the catalog points to).
     """
     chat_id = update.effective_chat.id
 
-    # Step 1: Send Image
-    with open(image_path, 'rb') as photo:
-        await context.bot.send_photo(chat_id=chat_id, photo=photo)
+    # Step 1: Send Image (in-memory JPEG or temp file path)
+    sent = await context.bot.send_photo(chat_id=chat_id, photo=ImageGenerator.as_input(poster))
+    ImageGenerator.remember_upload(poster, sent)
 
-    # Step 2: Prepare Video Caption
     # Step 2: Prepare Video Caption
     caption = (
         f"🎬 *Película:* {metadata['title']}\n"
@@ -31,31 +62,34 @@ async def send_publication(update: Update, context: ContextTypes.DEFAULT_TYPE, m
     keyboard = [[InlineKeyboardButton("📸 Instagram", url=settings.INSTAGRAM_URL)]]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    # Note: Since we are not downloading the full video (potentially GBs), 
-    # we will simulate the video step or send a placeholder message/link based on instructions.
-    # The user requirements said: "Publicar VIDEO". 
-    # If the user provides a FILE, we might forward it. 
-    # If it's from Archive.org, downloading 4GB to re-upload to TG via Bot API is impossible (50MB limit).
-    # We will assume for this implementation we post the LINK to the video or a small teaser if available.
-    # HOWEVER, the prompt implies "Entrada: Link ... O archivo de video".
-    # Since we are processing a LINK here, we will send the Archive.org link acting as the "video" source 
-    # or if a small mp4 exists in files, we could try sending that URL directly (TG supports URL sending).
-    
-    # Ideally, we find an .mp4 in the metadata files.
-    video_url = None
-    # We'd need to fetch file list again or pass it. 
-    # For now, let's assume we pass the IA Details Page URL as the 'video' link if no direct MP4 is found easily,
-    # OR we try to send the actual video URL if 'requests' allows streaming (Telegram supports sending by URL).
-    
-    # Let's try to construct a video URL if possible.
-    # We need the 'identifier' to construct https://archive.org/download/IDENTIFIER/filename.mp4
-    # We will leave the "Send Video" part generic for now, sending a message or URL.
-    
-    # REALISTIC IMPLEMENTATION FOR BOT API:
-    # We send the link with the caption.
-    # REALISTIC IMPLEMENTATION FOR BOT API:
-    # We send the link with the caption.
-    await context.bot.send_message(
+    # Step 3: Send Video
+    # Archive items: with the cloud Bot API, hand Telegram the URL of the best MP4 under the
+    # URL-send limit (Telegram fetches it, no video bytes go through our host).
+    # With a self-hosted Bot API server, stream the best MP4 (up to 2000 MB) through it.
+    # Otherwise post the link.
+    if metadata.get('video_url'):
+        try:
+            if LargeUpload.enabled():
+                return await upload_with_progress(
+                    context.bot, chat_id, metadata['video_url'],
+                    caption=caption, parse_mode="Markdown", reply_markup=reply_markup, supports_streaming=True
+                )
+            else:
+                return await context.bot.send_video(
+                    chat_id=chat_id,
+                    video=metadata['video_url'],
+                    caption=caption,
+                    parse_mode="Markdown",
+                    reply_markup=reply_markup,
+                    supports_streaming=True,
+                    read_timeout=60 # Telegram downloads the file before answering
+                )
+        except TelegramError as e: # e.g. "failed to get HTTP URL content", or flood control after the retries
+            logger.warning(f"Sending video failed, posting the link instead ({metadata['video_url']}): {e}")
+        except (httpx.HTTPError, ValueError) as e: # Download to the upload dir failed or too large
+            logger.warning(f"Downloading video failed, posting the link instead ({metadata['video_url']}): {e}")
+
+    return await context.bot.send_message(
         chat_id=chat_id,
         text=f"{caption}\n\n[Ver Película en Archive.org]({metadata.get('video_link', 'https://archive.org')})",
         parse_mode="Markdown", 
@@ -1,16 +1,39 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-import requests
 import logging
+from cinegram.services.archive_service import ArchiveService
+from cinegram.handlers.archive_handler import process_archive_item
 
 logger = logging.getLogger(__name__)
 
-# Reusing the existing ArchiveService if possible, but we need search capability.
-# We'll add a helper here or extend ArchiveService. For simplicity and modularity, 
-# since `services/archive_service` was simple get_metadata, let's add search logic here
-# or ideally update ArchiveService. Let's update ArchiveService first?
-# No, let's keep specific search logic here or in a separate function to avoid messing with approved files unless needed.
-# Actually, ArchiveService is the best place. I'll add a search method there in a moment.
+MAX_CALLBACK_BYTES = 64 # Telegram limit for callback_data
+
+def build_results_keyboard(query_id: str, page: dict):
+    """Result buttons plus '⬅️ Prev' / 'Next ➡️' navigation (state lives in the ArchiveService cache)."""
+    keyboard = []
+    for doc in page['results']:
+        title = doc.get('title') or 'Unknown'
+        if isinstance(title, list): # Some items have several titles
+            title = title[0]
+        year = doc.get('year', 'N/A')
+        identifier = doc.get('identifier')
+
+        # Using a callback data prefix 'IA_' to identify selection
+        callback_data = f"IA_{identifier}"
+        if len(callback_data.encode('utf-8')) > MAX_CALLBACK_BYTES:
+            logger.warning(f"Skipping result with too long identifier: {identifier}")
+            continue
+        keyboard.append([InlineKeyboardButton(f"🎬 {title[:30]} ({year})", callback_data=callback_data)])
+
+    navigation = []
+    if page['page'] > 0:
+        navigation.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"IAP_{query_id}_{page['page'] - 1}"))
+    if page['has_more']:
+        navigation.append(InlineKeyboardButton("Next ➡️", callback_data=f"IAP_{query_id}_{page['page'] + 1}"))
+    if navigation:
+        keyboard.append(navigation)
+
+    return InlineKeyboardMarkup(keyboard)
 
 async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -24,64 +47,45 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = " ".join(context.args)
     await update.message.reply_text(f"🔎 Searching for: **{query}**...", parse_mode="Markdown")
 
-    # Perform Search
-    # We want: mediatype:movies AND (title:query OR description:query) AND (language:spanish OR language:Spanish)
-    # The Internet Archive Advanced Search API is complex.
-    # Simple query: https://archive.org/advancedsearch.php
-    
-    base_url = "https://archive.org/advancedsearch.php"
-    
-    # Constructing a robust Lucene query
-    # Prioritize Spanish but don't strictly exclude if user searches specific native title? 
-    # User asked for: "que este en español latino" as preference.
-    # We can perform a query AND language:spanish first. If 0 results, try broader?
-    # Let's try restrictive first.
-    
-    lucene_query = f"(title:({query}) OR description:({query})) AND mediatype:(movies)"
-    # Note: Language metadata in IA is often messy ("Spanish", "spa", "es", "Spanish; Castilian").
-    # We'll try to sort by relevance.
-    
-    params = {
-        "q": lucene_query,
-        "fl": ["identifier", "title", "year", "language"],
-        "rows": 5,
-        "output": "json",
-        "sort": ["downloads desc"] # Sort by popularity usually gives better results than relevance for movies
-    }
-
-    try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        docs = data.get('response', {}).get('docs', [])
-
-        if not docs:
-            await update.message.reply_text("❌ No results found on Internet Archive.")
-            return
-
-        # Build Keyboard
-        keyboard = []
-        for doc in docs:
-            title = doc.get('title', 'Unknown')[:30] # Limit length
-            year = doc.get('year', 'N/A')
-            identifier = doc.get('identifier')
-            
-            # Using a callback data prefix 'PROCESS_' to identify selection
-            keyboard.append([InlineKeyboardButton(f"🎬 {title} ({year})", callback_data=f"IA_{identifier}")])
-
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.message.reply_text("👇 Select a movie to publish:", reply_markup=reply_markup)
-
-    except Exception as e:
-        logger.error(f"Search error: {e}")
+    page = await ArchiveService.search(query)
+    if page is None:
         await update.message.reply_text("❌ Error searching Internet Archive.")
+        return
+
+    if not page['results']:
+        await update.message.reply_text("❌ No results found on Internet Archive.")
+        return
+
+    reply_markup = build_results_keyboard(ArchiveService.query_id(query), page)
+    await update.message.reply_text("👇 Select a movie to publish:", reply_markup=reply_markup)
+
+async def handle_search_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handles '⬅️ Prev' / 'Next ➡️' buttons: edits the keyboard in place (pages come from the cache)."""
+    query = update.callback_query
+    _, query_id, page_number = query.data.split("_", 2)
+
+    search_query = ArchiveService.lookup_query(query_id)
+    if not search_query:
+        await query.answer("⌛ This search expired, run /search again.", show_alert=True)
+        return
+
+    page = await ArchiveService.search(search_query, page=int(page_number))
+    if not page or not page['results']:
+        await query.answer("❌ No more results.")
+        return
+
+    await query.answer()
+    await query.edit_message_reply_markup(reply_markup=build_results_keyboard(query_id, page))
 
 async def handle_search_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handles the selection of a search result."""
     query = update.callback_query
-    await query.answer()
-    
     data = query.data
+    if data.startswith("IAP_"):
+        await handle_search_page(update, context)
+        return
+
+    await query.answer()
     if not data.startswith("IA_"):
         return
 
@@ -106,7 +110,6 @@ async def handle_search_callback(update: Update, context: ContextTypes.DEFAULT_T
     # to separate `process_url(url, update, context)`.
     
     # Plan: Modify archive_handler.py to expose `process_archive_url(url, update, context)`.
-    from cinegram.handlers.archive_handler import process_archive_item
     
     # We will construct a link
     url = f"https://archive.org/details/{identifier}"
@@ -0,0 +1,35 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+from cinegram.config import settings
+from cinegram.services.metrics import Metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Per-stage latency percentiles, error counters and queue depths (admin only). Usage: /stats"""
+    if update.effective_user.id != settings.ADMIN_ID:
+        await update.message.reply_text("⛔ Solo el administrador.")
+        return
+
+    lines = [f"{'stage':<24} {'n':>6} {'p50':>7} {'p95':>7} {'p99':>7} err"]
+    for row in Metrics.stage_summary():
+        lines.append(
+            f"{row['flow'] + '.' + row['stage']:<24} {row['count']:>6} "
+            f"{row['p50'] * 1000:>5.0f}ms {row['p95'] * 1000:>5.0f}ms {row['p99'] * 1000:>5.0f}ms {row['errors']}"
+        )
+    counters = Metrics.counters()
+    if counters:
+        lines.append("")
+        lines.extend(f"{name} = {value:g}" for name, value in counters.items())
+    gauges = Metrics.gauges()
+    if gauges:
+        lines.append("")
+        lines.extend(f"{name} = {value:g}" for name, value in gauges.items())
+
+    body = "\n".join(lines).replace("`", "'")
+    if len(body) > MAX_MESSAGE_LENGTH - 30:
+        body = body[:MAX_MESSAGE_LENGTH - 30] + "\n…"
+    await update.message.reply_text(f"📈 *Stats*\n```\n{body}\n```", parse_mode="Markdown")
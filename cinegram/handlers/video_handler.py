@@ -1,76 +1,132 @@
+import asyncio
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters
+from telegram.error import TelegramError
+from telegram.ext import ContextTypes
 from cinegram.services.tmdb_service import TmdbService
 from cinegram.services.image_generator import ImageGenerator
+from cinegram.services.filename_parser import FilenameParser
+from cinegram.services.ingest_queue import IngestQueue
+from cinegram.services.catalog import PublishedCatalog
+from cinegram.handlers.publish_handler import already_published_text
 from cinegram.config import settings
 import logging
-import os
+from typing import List
 
 logger = logging.getLogger(__name__)
 
-# State definitions for Conversation (if we used full convo, but here we use simple flow)
-# For simplicity in this 'v1' extension, we'll try a 'reply to this message with details' approach 
-# or a simplified 'Send Metadata' command if we want state.
-# However, the user asked for: "El bot detecta... Te pide o infiere".
-# So a ConversationHandler is best.
-
 async def video_entry(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Autonomous entry point for video messages.
-    1. Receives Video
-    2. Cleans Filename -> Title
-    3. Searches TMDB
-    4. Generates Poster
-    5. Publishes (Image + Video)
+    Entry point for video messages.
+    Videos are not processed inline: they are queued and the IngestQueue workers
+    run process_video_job, so a forwarded batch of 200 videos flows at a steady pace.
     """
     message = update.message
     video = message.video or message.document
-    
+
     if not video:
         return
 
+    filename = video.file_name if hasattr(video, 'file_name') else "Unknown_Movie.mp4"
+
+    # Duplicates stop here, before any TMDB/translation/render work
+    post = PublishedCatalog.find(settings.CHANNEL_ID, PublishedCatalog.keys(file_unique_id=video.file_unique_id))
+    if post:
+        await message.reply_text(already_published_text(post))
+        return
+    active_job = IngestQueue.find_active(video.file_unique_id)
+    if active_job:
+        await message.reply_text(f"⏳ Este video ya está en cola (#{active_job}).")
+        return
+
+    job_id = IngestQueue.enqueue(message.chat_id, message.message_id, video.file_id, video.file_unique_id, filename)
+    ahead = IngestQueue.position(job_id)
+
     # Feedback
-    await message.reply_text("⚙️ **Procesando video automáticamente...**", parse_mode="Markdown")
+    await message.reply_text(f"📥 **En cola** (#{job_id}, {ahead} antes que este)", parse_mode="Markdown")
+
+async def queue_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Shows the ingest queue status. Usage: /queue"""
+    counts = IngestQueue.status_counts()
+    await update.message.reply_text(
+        "📊 **Cola de videos**\n"
+        f"⏳ En cola: {counts['queued']}\n"
+        f"⚙️ Procesando: {counts['running']}\n"
+        f"✅ Publicados: {counts['done']}\n"
+        f"⏭️ Omitidos: {counts['skipped']}\n"
+        f"❌ Fallidos: {counts['failed']}",
+        parse_mode="Markdown"
+    )
+
+async def prefetch_video_jobs(jobs: List[dict]):
+    """
+    Bulk step for a batch of queued videos (run by the IngestQueue ahead of the workers):
+    TMDB lookups run concurrently and the English-only synopses are translated together,
+    so process_video_job finds both cached instead of waiting on the LLM one by one.
+    """
+    parsed = await asyncio.gather(*(asyncio.to_thread(FilenameParser.parse_filename, job['file_name']) for job in jobs))
+    queries = [(data['title'], data['year']) for data in parsed if data]
+    await TmdbService.search_movies(queries)
+    logger.info(f"Prefetched TMDB data and translations for {len(queries)} queued videos.")
+
+async def process_video_job(bot, job: dict):
+    """
+    Autonomous pipeline for one queued video (run by the IngestQueue workers).
+    1. Cleans Filename -> Title
+    2. Searches TMDB
+    3. Validates
+    4. Generates Poster
+    5. Publishes (Image + Video)
+    Returns True once the video is in the channel. Upstream and publish errors propagate
+    so the queue retries the job; nothing raises after the video is sent.
+    """
+    job_id = job['id']
+    filename = job['file_name']
+
+    async def reply(text: str, **kwargs):
+        await bot.send_message(
+            chat_id=job['chat_id'],
+            text=text,
+            reply_to_message_id=job['message_id'],
+            allow_sending_without_reply=True,
+            **kwargs
+        )
+
+    await reply("⚙️ **Procesando video automáticamente...**", parse_mode="Markdown")
 
-    file_id = video.file_id
-    filename = video.file_name if hasattr(video, 'file_name') else "Unknown_Movie.mp4"
-    
     # --- 1. CLEAN TITLE & EXTRACT YEAR (Intelligent) ---
-    from cinegram.services.filename_parser import FilenameParser
-    
-    parsed_data = FilenameParser.parse_filename(filename)
-    
+    async with IngestQueue.stage("parse", job_id):
+        # guessit is CPU-bound: run it off the event loop so the stage limit actually bounds it
+        parsed_data = await asyncio.to_thread(FilenameParser.parse_filename, filename)
+
     if not parsed_data:
-        await message.reply_text(
+        await reply(
             "⚠️ **Error:** No pude entender el nombre del archivo.\n"
             "Por favor, renómbralo a algo más claro (Ej: 'Titulo Año.mp4') y reenvíalo."
         )
-        return
+        return False
 
     search_title = parsed_data['title']
     extracted_year = parsed_data['year']
-    
+
     # --- 2. SEARCH TMDB (With "Steroids") ---
-    await message.reply_text(f"🔍 Analizando: **{search_title}** ({extracted_year or '?'}) ...", parse_mode="Markdown")
-    
-    # Try Search with Year first
-    tmdb_data = TmdbService.search_movie(search_title, year=extracted_year)
-    
-    # If no result and had year, try without year (sometimes offsets vary)
-    if not tmdb_data and extracted_year:
-        tmdb_data = TmdbService.search_movie(search_title)
-        
+    await reply(f"🔍 Analizando: **{search_title}** ({extracted_year or '?'}) ...", parse_mode="Markdown")
+
+    async with IngestQueue.stage("tmdb", job_id):
+        # Try Search with Year first (a TMDB outage raises, so the job is retried instead of cancelled)
+        tmdb_data = await TmdbService.search_movie(search_title, year=extracted_year, raise_errors=True)
+
+        # If no result and had year, try without year (sometimes offsets vary)
+        if not tmdb_data and extracted_year:
+            tmdb_data = await TmdbService.search_movie(search_title, raise_errors=True)
+
     # --- 3. STRICT VALIDATION ---
     if not tmdb_data:
-        await message.reply_text(
+        await reply(
             f"🚫 **Cancelado:** No encontré nada en TMDB para '{search_title}'.\n"
             "El archivo no se ha publicado.\n\n"
             "👉 **Solución:** Responde a este mensaje con el **Nombre Correcto** (y año opcional) para buscarlo manualmente."
         )
-        # Store context to allow reply handling (we need to route text replies to a search handler logic via a simple check in bot.py?)
-        # For now, simplest is asking them to use /search or rely on reply if we restore conversation.
-        # But wait, user wants autonomous. If autonomous fails, we stop.
-        return
+        return False
 
     # Extract Data
     title = tmdb_data.get('title')
@@ -82,91 +138,89 @@ async def video_entry(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Strict Check: Must have Poster and Year
     if not poster_path or not year:
-        await message.reply_text(
+        await reply(
             f"🚫 **Incompleto:** Encontré '{title}' pero le falta la portada o el año.\n"
             "No voy a publicar contenido incompleto.\n\n"
             "👉 Intenta buscar otra versión con `/search {title}`"
         )
-        return
+        return False
+
+    # Same movie already in the channel (maybe from another file): remember this file too, skip the render
+    channel_id = settings.CHANNEL_ID
+    post = PublishedCatalog.find(channel_id, PublishedCatalog.keys(tmdb_id=tmdb_data.get('id')))
+    if post:
+        PublishedCatalog.add_keys(post, PublishedCatalog.keys(file_unique_id=job['file_unique_id']))
+        await reply(already_published_text(post))
+        return False
 
     # --- 4. GENERATE & PUBLISH ---
-    poster_url = TmdbService.get_poster_url(poster_path)
-    await message.reply_text("🎨 Generando portada...", parse_mode="Markdown")
-    
-    try:
-        image_path = ImageGenerator.generate_poster(poster_url, title, description)
-    except Exception as e:
-        await message.reply_text("❌ Error generando la imagen.")
-        return
+    poster_url = TmdbService.get_artwork_url(tmdb_data)
+    await reply("🎨 Generando portada...", parse_mode="Markdown")
 
-    # --- 5. PUBLISH TO CHANNEL (With Retry Logic) ---
-    channel_id = settings.CHANNEL_ID
-    
-    # Imports for retry logic
-    import asyncio
-    from telegram.error import RetryAfter
+    async with IngestQueue.stage("render", job_id):
+        poster = await ImageGenerator.generate_poster(poster_url, title, description)
 
-    try:
-        # Send Image
-        if image_path and os.path.exists(image_path):
-            while True:
+    # --- 5. PUBLISH TO CHANNEL (Rate limited by the SendScheduler) ---
+    # Prepare Hashtags
+    hashtag_list = []
+    if genre:
+        # Split by comma usually
+        g_list = [g.strip() for g in genre.split(',')]
+        for g in g_list[:3]: # Max 3
+            # Remove spaces and make it like CamelCase/PascalCase for hashtag
+            # e.g. "Ciencia ficción" -> "CienciaFicción"
+            clean_tag = "".join(word.capitalize() for word in g.split())
+            hashtag_list.append(f"#{clean_tag}")
+
+    hashtags = " ".join(hashtag_list)
+
+    # Prepare Caption
+    caption = (
+        f"🎬 *Película:* {title}\n"
+        f"📅 *Año:* {year}\n"
+        f"🌎 *Idioma:* Latino 🇨🇴🇲🇽\n"
+        f"💿 *Calidad:* HD\n"
+        f"⭐ *Calificación:* {rating}\n"
+        f"🎭 *Género:* {genre}\n\n"
+        f"📝 *Sinopsis:*\n{description[:800]}...\n\n"
+        f"{hashtags}\n\n"
+        f"🔗 *Síguenos en Instagram:*"
+    )
+
+    keyboard = [[InlineKeyboardButton("📸 Instagram", url=settings.INSTAGRAM_URL)]]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    async with IngestQueue.stage("publish", job_id):
+        # Send Image (rate limits and RetryAfter are handled by the SendScheduler; errors retry the job)
+        photo_post = None
+        if poster:
+            photo_post = await bot.send_photo(chat_id=channel_id, photo=ImageGenerator.as_input(poster))
+            ImageGenerator.remember_upload(poster, photo_post)
+
+        try:
+            video_post = await bot.send_video(
+                chat_id=channel_id,
+                video=job['file_id'],
+                caption=caption,
+                parse_mode="Markdown",
+                reply_markup=reply_markup
+            )
+        except Exception:
+            # Don't leave an orphan poster in the channel: the retry sends it again
+            if photo_post:
                 try:
-                    with open(image_path, 'rb') as photo:
-                        await context.bot.send_photo(chat_id=channel_id, photo=photo)
-                    break # Success, exit loop
-                except RetryAfter as e:
-                    logger.warning(f"Flood control exceeded. Sleeping for {e.retry_after} seconds.")
-                    await asyncio.sleep(e.retry_after)
-                except Exception as e:
-                    logger.error(f"Error sending photo: {e}")
-                    break # Other error, skip photo
-
-        # Prepare Hashtags
-        hashtag_list = []
-        if genre:
-            # Split by comma usually
-            g_list = [g.strip() for g in genre.split(',')]
-            for g in g_list[:3]: # Max 3
-                # Remove spaces and make it like CamelCase/PascalCase for hashtag
-                # e.g. "Ciencia ficción" -> "CienciaFicción"
-                clean_tag = "".join(word.capitalize() for word in g.split())
-                hashtag_list.append(f"#{clean_tag}")
-                
-        hashtags = " ".join(hashtag_list)
-
-        # Prepare Caption
-        caption = (
-            f"🎬 *Película:* {title}\n"
-            f"📅 *Año:* {year}\n"
-            f"🌎 *Idioma:* Latino 🇨🇴🇲🇽\n"
-            f"💿 *Calidad:* HD\n"
-            f"⭐ *Calificación:* {rating}\n"
-            f"🎭 *Género:* {genre}\n\n"
-            f"📝 *Sinopsis:*\n{description[:800]}...\n\n"
-            f"{hashtags}\n\n"
-            f"🔗 *Síguenos en Instagram:*"
+                    await photo_post.delete()
+                except TelegramError as e:
+                    logger.warning(f"Could not delete the poster of job #{job_id}: {e}")
+            raise
+
+    # The post exists from here on: nothing below may fail the job (a retry would publish it twice)
+    try:
+        PublishedCatalog.record(
+            video_post, title, year, PublishedCatalog.keys(tmdb_id=tmdb_data.get('id'), file_unique_id=job['file_unique_id']),
+            destination=channel_id
         )
-        
-        keyboard = [[InlineKeyboardButton("📸 Instagram", url=settings.INSTAGRAM_URL)]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        while True:
-            try:
-                await context.bot.send_video(
-                    chat_id=channel_id,
-                    video=file_id,
-                    caption=caption,
-                    parse_mode="Markdown",
-                    reply_markup=reply_markup
-                )
-                break # Success
-            except RetryAfter as e:
-                logger.warning(f"Flood control exceeded for video. Sleeping for {e.retry_after} seconds.")
-                await message.reply_text(f"⏳ Telegram me pidió esperar {e.retry_after}s... (Pausando para evitar bloqueo)")
-                await asyncio.sleep(e.retry_after)
-            
-        await message.reply_text(f"✅ **Publicado:** {title} ({year})")
-        
+        await reply(f"✅ **Publicado:** {title} ({year})")
     except Exception as e:
-        logger.error(f"Error publishing: {e}")
-        await message.reply_text(f"❌ Error enviando al canal: {e}")
+        logger.error(f"Job #{job_id} was published, but the follow-up failed: {e}")
+    return True
@@ -1,19 +1,180 @@
-import requests
+import hashlib
+import httpx
 import logging
+import os
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional
+from cinegram.config import settings
+from cinegram.services.cache_store import CacheStore
+from cinegram.services.http_client import HttpClient
 
 logger = logging.getLogger(__name__)
 
 class ArchiveService:
     BASE_URL = "https://archive.org/metadata/"
+    SCRAPE_URL = "https://archive.org/services/search/v1/scrape"
+    SEARCH_FIELDS = "identifier,title,year,language"
+
+    # Scrape batches per (query, batch index) plus query texts for the inline keyboard
+    search_cache = CacheStore("ia_search", ttl=settings.IA_SEARCH_CACHE_TTL, max_entries=20000)
+    # Compact items (see compact_item); unknown identifiers are cached as None for a short while
+    item_cache = CacheStore("ia_items", ttl=settings.IA_ITEM_CACHE_TTL, negative_ttl=600, max_entries=20000)
+
+    # Item metadata fields we actually use
+    ITEM_FIELDS = ("identifier", "title", "date", "description", "subject", "language")
 
     @staticmethod
-    def get_metadata(identifier: str) -> dict:
+    async def get_metadata(identifier: str) -> dict:
         """Fetches metadata and file list for a given identifier."""
         url = f"{ArchiveService.BASE_URL}{identifier}"
         try:
-            response = requests.get(url)
+            response = await HttpClient.get(url)
             response.raise_for_status()
             return response.json()
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error fetching metadata for {identifier}: {e}")
             return None
+
+    @staticmethod
+    def compact_item(data: dict) -> Optional[Dict]:
+        """
+        Reduces the IA metadata JSON (thousands of 'files' entries with hashes, mtimes...)
+        to what we use, plus an index of file positions by format and by extension:
+        {'metadata': {...}, 'server', 'dir', 'files': [[name, format, size], ...],
+         'formats': {format: [i, ...]}, 'extensions': {ext: [i, ...]}}
+        Positions keep the original file order, so lookups pick the same file a linear scan would.
+        """
+        if not data or 'metadata' not in data:
+            return None
+
+        metadata = {key: data['metadata'][key] for key in ArchiveService.ITEM_FIELDS if key in data['metadata']}
+        files: List[list] = []
+        formats: Dict[str, List[int]] = {}
+        extensions: Dict[str, List[int]] = {}
+        for position, f in enumerate(data.get('files', [])):
+            name = f.get('name', '')
+            file_format = f.get('format', '')
+            size = int(f['size']) if str(f.get('size', '')).isdigit() else None
+            files.append([name, file_format, size])
+            formats.setdefault(file_format, []).append(position)
+            extension = os.path.splitext(name)[1].lower().lstrip('.')
+            if extension:
+                extensions.setdefault(extension, []).append(position)
+
+        return {
+            "metadata": metadata,
+            "server": data.get('server'),
+            "dir": data.get('dir'),
+            "files": files,
+            "formats": formats,
+            "extensions": extensions
+        }
+
+    @staticmethod
+    async def get_item(identifier: str) -> Optional[Dict]:
+        """
+        Compact item (compact_item) with TTL cache: repeated lookups of the same item
+        skip both the network and the full JSON parse. None if not found or unreachable.
+        """
+        cached = ArchiveService.item_cache.get(identifier)
+        if cached is not CacheStore.MISS:
+            return cached
+
+        data = await ArchiveService.get_metadata(identifier)
+        if data is None:
+            return None # Network error: not cached, the next call retries
+
+        item = ArchiveService.compact_item(data)
+        ArchiveService.item_cache.set(identifier, item) # IA answers {} for unknown identifiers
+        return item
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        return " ".join(query.split()).casefold()
+
+    @staticmethod
+    def query_id(query: str) -> str:
+        """
+        Short id for a query (callback_data is limited to 64 bytes, so buttons carry
+        this id instead of the query). The query text is kept in the cache.
+        """
+        normalized = ArchiveService._normalize_query(query)
+        qid = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+        ArchiveService.search_cache.set(f"q:{qid}", query)
+        return qid
+
+    @staticmethod
+    def lookup_query(qid: str) -> Optional[str]:
+        query = ArchiveService.search_cache.get(f"q:{qid}")
+        return None if query is CacheStore.MISS else query
+
+    @staticmethod
+    async def _fetch_batch(query: str, index: int, cursor: Optional[str]) -> dict:
+        """One scrape API batch. Cached, so paging back and forth never re-queries IA."""
+        key = f"{ArchiveService._normalize_query(query)}:{index}"
+        cached = ArchiveService.search_cache.get(key)
+        if cached is not CacheStore.MISS:
+            return cached
+
+        # Lucene query: title or description match, movies only
+        params = {
+            "q": f"(title:({query}) OR description:({query})) AND mediatype:(movies)",
+            "fields": ArchiveService.SEARCH_FIELDS,
+            "count": settings.IA_SEARCH_BATCH, # The scrape API requires at least 100
+            "sorts": "downloads desc" # Popularity gives better results than relevance for movies
+        }
+        if cursor:
+            params["cursor"] = cursor
+
+        response = await HttpClient.get(ArchiveService.SCRAPE_URL, params=params)
+        response.raise_for_status()
+        data = response.json()
+        batch = {"items": data.get("items", []), "cursor": data.get("cursor"), "total": data.get("total")}
+        ArchiveService.search_cache.set(key, batch)
+        return batch
+
+    @staticmethod
+    async def iter_search(query: str) -> AsyncIterator[dict]:
+        """Streams results lazily (next batch only fetched when needed), without duplicate identifiers."""
+        seen = set()
+        cursor = None
+        index = 0
+        while True:
+            batch = await ArchiveService._fetch_batch(query, index, cursor)
+            for item in batch["items"]:
+                identifier = item.get("identifier")
+                if not identifier or identifier in seen:
+                    continue
+                seen.add(identifier)
+                yield item
+
+            cursor = batch.get("cursor")
+            if not cursor:
+                return
+            index += 1
+
+    @staticmethod
+    async def search(query: str, page: int = 0, page_size: Optional[int] = None) -> Optional[dict]:
+        """
+        Returns one page of results: {'results': [...], 'page': n, 'has_more': bool}.
+        None if Internet Archive could not be reached.
+        """
+        page_size = page_size or settings.IA_SEARCH_PAGE_SIZE
+        start = page * page_size
+        results = []
+        has_more = False
+        try:
+            position = 0
+            async with aclosing(ArchiveService.iter_search(query)) as items:
+                async for item in items:
+                    if position >= start + page_size:
+                        has_more = True
+                        break
+                    if position >= start:
+                        results.append(item)
+                    position += 1
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error searching Internet Archive for '{query}': {e}")
+            return None
+
+        return {"results": results, "page": page, "has_more": has_more}
@@ -1,46 +1,67 @@
-import json
-import os
 import logging
+import threading
+from typing import Optional, Set
 from cinegram.config import settings
+from cinegram.services.user_store import UserStore
 
 logger = logging.getLogger(__name__)
 
 class AuthService:
-    WHITELIST_FILE = os.path.join(settings.ASSETS_DIR, "whitelist.json")
+    # In-memory set of authorized users (loaded from the UserStore): is_authorized never touches the disk
+    _authorized: Optional[Set[int]] = None
+    _data_version: Optional[int] = None
+    _lock = threading.Lock()
 
     @staticmethod
-    def _load_whitelist():
-        if not os.path.exists(AuthService.WHITELIST_FILE):
-            return []
-        try:
-            with open(AuthService.WHITELIST_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading whitelist: {e}")
-            return []
+    def _ensure_loaded():
+        if AuthService._authorized is None:
+            with AuthService._lock:
+                if AuthService._authorized is None:
+                    AuthService._data_version = UserStore.data_version()
+                    AuthService._authorized = UserStore.authorized_user_ids()
 
     @staticmethod
-    def _save_whitelist(whitelist):
-        try:
-            with open(AuthService.WHITELIST_FILE, 'w') as f:
-                json.dump(whitelist, f)
-        except Exception as e:
-            logger.error(f"Error saving whitelist: {e}")
+    def reload_if_changed() -> bool:
+        """Reloads the set if the database was changed outside the bot. Returns True if reloaded."""
+        version = UserStore.data_version()
+        if AuthService._authorized is not None and version == AuthService._data_version:
+            return False
+        with AuthService._lock:
+            AuthService._data_version = version
+            AuthService._authorized = UserStore.authorized_user_ids()
+        logger.info(f"Authorized users reloaded ({len(AuthService._authorized)} users).")
+        return True
 
     @staticmethod
     def is_authorized(user_id: int) -> bool:
         # 1. Admin is always authorized
         if user_id == settings.ADMIN_ID:
             return True
-            
-        # 2. Check whitelist
-        whitelist = AuthService._load_whitelist()
-        return user_id in whitelist
+
+        # 2. Check authorized users (in-memory set, O(1))
+        AuthService._ensure_loaded()
+        return user_id in AuthService._authorized
+
+    @staticmethod
+    def authorize_user(user_id: int, source: str = "password", payment_id: Optional[int] = None,
+                       first_name: Optional[str] = None, username: Optional[str] = None):
+        """Grants access and records how it was obtained ('password', 'stars', ...)."""
+        AuthService._ensure_loaded()
+        UserStore.upsert_user(user_id, first_name, username)
+        if user_id in AuthService._authorized and payment_id is None:
+            return
+        UserStore.grant_access(user_id, source, payment_id)
+        with AuthService._lock:
+            AuthService._authorized.add(user_id)
+        logger.info(f"User {user_id} authorized ({source}).")
 
     @staticmethod
-    def authorize_user(user_id: int):
-        whitelist = AuthService._load_whitelist()
-        if user_id not in whitelist:
-            whitelist.append(user_id)
-            AuthService._save_whitelist(whitelist)
-            logger.info(f"User {user_id} authorized.")
+    def record_payment(user_id: int, payment) -> Optional[int]:
+        """Stores a Telegram SuccessfulPayment. Returns the payment id (None if already recorded)."""
+        return UserStore.record_payment(
+            user_id,
+            payment.telegram_payment_charge_id,
+            payment.currency,
+            payment.total_amount,
+            payment.invoice_payload
+        )
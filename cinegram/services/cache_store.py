@@ -0,0 +1,133 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from cinegram.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStore:
+    """
+    Persistent key/value cache: SQLite on disk with an in-memory LRU in front.
+    Values must be JSON-serializable. Storing None is a negative entry
+    (e.g. "TMDB has nothing for this title") and uses the shorter negative TTL.
+    """
+    MISS = object()  # Sentinel: get() returns this when nothing (valid) is cached
+
+    def __init__(self, name: str, ttl: float, negative_ttl: Optional[float] = None,
+                 memory_size: int = 1024, max_entries: Optional[int] = None):
+        self.name = name
+        self.path = os.path.join(settings.CACHE_DIR, f"{name}.sqlite3")
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl if negative_ttl is not None else ttl
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened lazily so importing a service never touches the disk
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT, expires_at REAL, accessed_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+        return self._conn
+
+    def _remember(self, key: str, expires_at: float, value: Any):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Any:
+        """Returns the cached value (possibly None for a negative entry) or CacheStore.MISS."""
+        now = time.time()
+        with self._lock:
+            # 1. Memory LRU
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            # 2. Disk
+            try:
+                row = self._db().execute(
+                    "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    value = json.loads(row[0])
+                    self._db().execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._remember(key, row[1], value)
+                    self.hits += 1
+                    return value
+            except sqlite3.Error as e:
+                logger.error(f"Cache '{self.name}' read failed: {e}")
+
+            self.misses += 1
+            return CacheStore.MISS
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Stores a value. None is cached as a negative result."""
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            try:
+                self._db().execute(
+                    "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, now)
+                )
+                # Eviction needs a COUNT(*), so only run it every few writes
+                self._writes += 1
+                if self.max_entries and self._writes % 100 == 0:
+                    self._evict()
+            except sqlite3.Error as e:
+                logger.error(f"Cache '{self.name}' write failed: {e}")
+
+    def _evict(self):
+        # Drop expired rows first, then least recently used ones above the cap
+        db = self._db()
+        db.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        count = db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count > self.max_entries:
+            db.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+            try:
+                self._db().execute("DELETE FROM entries WHERE key = ?", (key,))
+            except sqlite3.Error as e:
+                logger.error(f"Cache '{self.name}' delete failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "memory_entries": len(self._memory)
+        }
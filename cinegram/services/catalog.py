@@ -0,0 +1,131 @@
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, Iterable, List, Optional
+from cinegram.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PublishedCatalog:
+    """
+    What has already been published, per destination chat (SQLite, WAL).
+    A post is found by any of its keys: TMDB id, Telegram file_unique_id, IA identifier
+    or external URL, so handlers can drop a duplicate before any network or CPU work.
+    Posts are stored under the numeric chat id; a destination configured as '@channel'
+    is mapped to it by the first publication there (chat_aliases).
+    """
+    DB_PATH = settings.CATALOG_DB_PATH
+
+    _conn: Optional[sqlite3.Connection] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _db() -> sqlite3.Connection:
+        if PublishedCatalog._conn is None:
+            with PublishedCatalog._lock:
+                if PublishedCatalog._conn is None:
+                    conn = sqlite3.connect(PublishedCatalog.DB_PATH, check_same_thread=False, isolation_level=None)
+                    conn.row_factory = sqlite3.Row
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    conn.executescript(
+                        """
+                        CREATE TABLE IF NOT EXISTS posts (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            chat_id INTEGER NOT NULL,
+                            message_id INTEGER,
+                            title TEXT,
+                            year TEXT,
+                            link TEXT,
+                            published_at REAL NOT NULL
+                        );
+                        CREATE TABLE IF NOT EXISTS post_keys (
+                            chat_id INTEGER NOT NULL,
+                            key TEXT NOT NULL,
+                            post_id INTEGER NOT NULL,
+                            PRIMARY KEY (chat_id, key)
+                        );
+                        CREATE TABLE IF NOT EXISTS chat_aliases (
+                            alias TEXT PRIMARY KEY,
+                            chat_id INTEGER NOT NULL
+                        );
+                        """
+                    )
+                    PublishedCatalog._conn = conn
+        return PublishedCatalog._conn
+
+    @staticmethod
+    def _alias(chat_id) -> Optional[str]:
+        """'@channel' for a username destination (case-insensitive), None for numeric ids."""
+        try:
+            int(chat_id)
+            return None
+        except (TypeError, ValueError):
+            return str(chat_id).lower()
+
+    @staticmethod
+    def _chat(chat_id) -> Optional[int]:
+        """Numeric chat id ('-100123' from settings and -100123 are the same chat). None for an unknown username."""
+        alias = PublishedCatalog._alias(chat_id)
+        if alias is None:
+            return int(chat_id)
+        row = PublishedCatalog._db().execute("SELECT chat_id FROM chat_aliases WHERE alias = ?", (alias,)).fetchone()
+        return row[0] if row else None # Nothing published there yet
+
+    @staticmethod
+    def keys(tmdb_id=None, file_unique_id: Optional[str] = None, ia_identifier: Optional[str] = None,
+             url: Optional[str] = None) -> List[str]:
+        """Catalog keys for whatever identifies the item (missing values are skipped)."""
+        parts = (("tmdb", tmdb_id), ("file", file_unique_id), ("ia", ia_identifier), ("url", url))
+        return [f"{kind}:{value}" for kind, value in parts if value]
+
+    @staticmethod
+    def find(chat_id, keys: Iterable[str]) -> Optional[Dict]:
+        """The post already published in chat_id under any of the keys, or None."""
+        keys = list(keys)
+        chat = PublishedCatalog._chat(chat_id) if chat_id is not None else None
+        if not keys or chat is None:
+            return None
+        row = PublishedCatalog._db().execute(
+            f"SELECT posts.* FROM post_keys JOIN posts ON posts.id = post_keys.post_id "
+            f"WHERE post_keys.chat_id = ? AND post_keys.key IN ({', '.join('?' * len(keys))}) LIMIT 1",
+            (chat, *keys)
+        ).fetchone()
+        return dict(row) if row else None
+
+    @staticmethod
+    def record(message, title: str, year: Optional[str], keys: Iterable[str], destination=None) -> int:
+        """
+        Stores a sent publication (the Message of the post) under its keys. Returns the post id.
+        destination is the chat_id the post was sent to, when it may be an '@channel' username.
+        """
+        alias = PublishedCatalog._alias(destination) if destination is not None else None
+        db = PublishedCatalog._db()
+        with PublishedCatalog._lock, db:
+            db.execute("BEGIN")
+            if alias:
+                db.execute("INSERT OR REPLACE INTO chat_aliases (alias, chat_id) VALUES (?, ?)", (alias, message.chat_id))
+            post_id = db.execute(
+                "INSERT INTO posts (chat_id, message_id, title, year, link, published_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (message.chat_id, message.message_id, title, year, message.link, time.time())
+            ).lastrowid
+            db.executemany(
+                "INSERT OR REPLACE INTO post_keys (chat_id, key, post_id) VALUES (?, ?, ?)",
+                [(message.chat_id, key, post_id) for key in keys]
+            )
+        logger.info(f"Catalog: '{title}' ({year}) published in {message.chat_id} as post {post_id}.")
+        return post_id
+
+    @staticmethod
+    def add_keys(post: Dict, keys: Iterable[str]):
+        """Attaches more keys to a known post (e.g. another file of a movie found by its TMDB id)."""
+        PublishedCatalog._db().executemany(
+            "INSERT OR IGNORE INTO post_keys (chat_id, key, post_id) VALUES (?, ?, ?)",
+            [(post['chat_id'], key, post['id']) for key in keys]
+        )
+
+    @staticmethod
+    def count() -> int:
+        return PublishedCatalog._db().execute("SELECT COUNT(*) FROM posts").fetchone()[0]
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from cinegram.config import settings
+from cinegram.services.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 is only available when the optional 'h2' package is installed (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class HttpClient:
+    """
+    Shared, pooled async HTTP client used by every service (TMDB, Internet Archive, Ollama, images).
+    A single connection pool keeps sockets alive between calls, and a per-host semaphore
+    stops one slow upstream from hogging every connection.
+    """
+    _client: Optional[httpx.AsyncClient] = None
+    _host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    @staticmethod
+    def get_client() -> httpx.AsyncClient:
+        """Returns the shared client, creating it lazily on first use."""
+        if HttpClient._client is None or HttpClient._client.is_closed:
+            use_http2 = settings.HTTP2_ENABLED and HTTP2_AVAILABLE
+            HttpClient._client = httpx.AsyncClient(
+                http2=use_http2,
+                follow_redirects=True,
+                timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=30
+                ),
+                headers={"User-Agent": "CineGramBot/1.0"}
+            )
+            logger.info(f"HTTP client started (http2={use_http2}).")
+        return HttpClient._client
+
+    @staticmethod
+    def _host_limit(url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in HttpClient._host_limits:
+            HttpClient._host_limits[host] = asyncio.Semaphore(settings.HTTP_PER_HOST_LIMIT)
+        return HttpClient._host_limits[host]
+
+    @staticmethod
+    def _upstream(url: str) -> str:
+        # Metrics label: 'ia800204.us.archive.org' -> 'archive.org' (keeps the label set small)
+        return ".".join(urlsplit(url).netloc.split(".")[-2:])
+
+    @staticmethod
+    def _record(url: str, started: float, status: Optional[int] = None):
+        upstream = HttpClient._upstream(url)
+        Metrics.observe("http", upstream, time.perf_counter() - started)
+        if status is None or status == 429 or status >= 500:
+            Metrics.inc("upstream_errors_total", upstream=upstream)
+
+    @staticmethod
+    async def request(method: str, url: str, **kwargs) -> httpx.Response:
+        """Performs a request through the shared pool. Raises httpx.HTTPError on failure."""
+        async with HttpClient._host_limit(url):
+            started = time.perf_counter()
+            try:
+                response = await HttpClient.get_client().request(method, url, **kwargs)
+            except httpx.HTTPError:
+                HttpClient._record(url, started)
+                raise
+            HttpClient._record(url, started, response.status_code)
+            return response
+
+    @staticmethod
+    async def get(url: str, **kwargs) -> httpx.Response:
+        return await HttpClient.request("GET", url, **kwargs)
+
+    @staticmethod
+    async def post(url: str, **kwargs) -> httpx.Response:
+        return await HttpClient.request("POST", url, **kwargs)
+
+    @staticmethod
+    @asynccontextmanager
+    async def stream(method: str, url: str, **kwargs):
+        """Streams a response body (use for large downloads or NDJSON)."""
+        async with HttpClient._host_limit(url):
+            started = time.perf_counter()
+            recorded = False
+            try:
+                async with HttpClient.get_client().stream(method, url, **kwargs) as response:
+                    HttpClient._record(url, started, response.status_code) # Time to headers
+                    recorded = True
+                    yield response
+            except httpx.TransportError:
+                if recorded: # Failed mid-body
+                    Metrics.inc("upstream_errors_total", upstream=HttpClient._upstream(url))
+                else:
+                    HttpClient._record(url, started)
+                raise
+
+    @staticmethod
+    async def close():
+        """Closes the pool. Called on application shutdown."""
+        if HttpClient._client is not None:
+            await HttpClient._client.aclose()
+            HttpClient._client = None
+        HttpClient._host_limits = {}
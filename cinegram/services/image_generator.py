@@ -1,136 +1,105 @@
 import os
-import requests
-import textwrap
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
-from io import BytesIO
+import re
+import uuid
+import logging
+from pathlib import Path
+from typing import Optional, Union
 from cinegram.config import settings
+from cinegram.services.http_client import HttpClient
+from cinegram.services.render_pool import RenderPool
+from cinegram.services.poster_cache import PosterCache
+from cinegram.services.metrics import Metrics
+
+logger = logging.getLogger(__name__)
 
 class ImageGenerator:
     @staticmethod
-    def generate_poster(image_url: str, title: str, description: str) -> str:
+    async def download_image(image_url: str) -> Optional[bytes]:
         """
-        Generates a 1920x1080 poster with title and description overlay.
-        Returns the path to the generated image.
+        Streams the source artwork, aborting once it exceeds IMAGE_MAX_BYTES.
+        Returns None if the download fails or is too large.
         """
-        # 1. Download or Load Image
+        limit = settings.IMAGE_MAX_BYTES
         try:
-            response = requests.get(image_url)
-            response.raise_for_status()
-            img = Image.open(BytesIO(response.content)).convert("RGBA")
+            with Metrics.timer("services", "download"):
+                async with HttpClient.stream("GET", image_url) as response:
+                    response.raise_for_status()
+                    if int(response.headers.get("Content-Length") or 0) > limit:
+                        logger.warning(f"Image too large ({response.headers['Content-Length']} bytes): {image_url}")
+                        return None
+                    chunks = []
+                    received = 0
+                    async for chunk in response.aiter_bytes():
+                        received += len(chunk)
+                        if received > limit:
+                            logger.warning(f"Image exceeded {limit} bytes, aborting: {image_url}")
+                            return None
+                        chunks.append(chunk)
+                    return b"".join(chunks)
         except Exception as e:
-            print(f"Error loading image: {e}")
-            # Create a black placeholder if image download fails
-            img = Image.new("RGBA", (1920, 1080), (0, 0, 0, 255))
-
-        # 2. Resize/Crop to 1920x1080 (Aspect Fill)
-        target_size = settings.IMAGE_SIZE
-        img_ratio = img.width / img.height
-        target_ratio = target_size[0] / target_size[1]
+            logger.warning(f"Error loading image {image_url}: {e}")
+            return None
 
-        if img_ratio > target_ratio:
-            # Image is wider, resize by height
-            new_height = target_size[1]
-            new_width = int(new_height * img_ratio)
-        else:
-            # Image is taller, resize by width
-            new_width = target_size[0]
-            new_height = int(new_width / img_ratio)
-
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        # Center Crop
-        left = (img.width - target_size[0]) / 2
-        top = (img.height - target_size[1]) / 2
-        right = (img.width + target_size[0]) / 2
-        bottom = (img.height + target_size[1]) / 2
-        img = img.crop((left, top, right, bottom))
+    @staticmethod
+    async def load_artwork(image_url: str) -> Optional[bytes]:
+        """
+        Source artwork from the artwork cache, downloaded on a miss.
+        Also used to prefetch a fallback image while other metadata is still loading.
+        """
+        artwork_key = PosterCache.artwork_key(image_url)
+        image_bytes = PosterCache.artwork.get(artwork_key)
+        if image_bytes is None:
+            image_bytes = await ImageGenerator.download_image(image_url)
+            if image_bytes is not None:
+                PosterCache.artwork.put(artwork_key, image_bytes)
+        return image_bytes
 
-        # 3. Add Dark Overlay (Gradient or solid semi-transparent)
-        overlay = Image.new("RGBA", target_size, (0, 0, 0, 0))
-        draw = ImageDraw.Draw(overlay)
-        # Gradient from bottom 60% to bottom
-        for y in range(int(target_size[1] * 0.4), target_size[1]):
-            alpha = int(255 * ((y - target_size[1] * 0.4) / (target_size[1] * 0.6)))
-            draw.line([(0, y), (target_size[0], y)], fill=(0, 0, 0, alpha))
-        
-        img = Image.alpha_composite(img, overlay)
+    @staticmethod
+    async def generate_poster(image_url: str, title: str, description: str) -> Union[bytes, str]:
+        """
+        Generates a 1920x1080 poster with title and description overlay.
+        Returns the encoded JPEG bytes (POSTER_OUTPUT_MODE=memory, default)
+        or the path to the generated image (POSTER_OUTPUT_MODE=file).
+        """
+        # 0. Same artwork + text + template already rendered?
+        poster_key = PosterCache.poster_key(image_url, title, description)
+        jpeg = PosterCache.posters.get(poster_key)
 
-        # 4. Add Text
-        draw = ImageDraw.Draw(img)
-        
-        # Load Font
-        try:
-            # Try configured font, fallback to Arial if on Windows/generic
-            font_path = settings.DEFAULT_FONT_PATH
-            if not os.path.exists(font_path):
-                font_path = "arial.ttf" # Common on Windows
-            
-            title_font = ImageFont.truetype(font_path, 80)
-            desc_font = ImageFont.truetype(font_path, 40)
-        except IOError:
-            # Fallback to default if load fails
-            title_font = ImageFont.load_default()
-            desc_font = ImageFont.load_default()
+        if jpeg is None:
+            # 1. Download Image (cached by URL; a failed download renders on a black placeholder)
+            image_bytes = await ImageGenerator.load_artwork(image_url)
 
-        # Text Positioning
-        margin_x = 100
-        margin_y = 100
-        max_width_chars = 50 # approx for wrapping
+            # 2. Compose + encode in the render pool (CPU-bound, off the event loop)
+            jpeg = await RenderPool.render(image_bytes, title, description)
+            if image_bytes is not None:
+                PosterCache.posters.put(poster_key, jpeg)
 
-        # Draw Title
-        # split title if too long?
-        title_lines = textwrap.wrap(title, width=25)
-        current_y = target_size[1] - 350 # Start from bottom-ish area
-        for line in title_lines:
-             # Calculate text width to verify fit if needed, but simple draw is often enough
-             draw.text((margin_x, current_y), line, font=title_font, fill="white")
-             current_y += 90 # Line height
+        if settings.POSTER_OUTPUT_MODE != "file":
+            return jpeg
 
-        # Draw Description (Synopsis)
-        current_y += 20
-        # Limit description lines
-        clean_desc = (description[:300] + '...') if len(description) > 300 else description
-        desc_lines = textwrap.wrap(clean_desc, width=70)[:6] # Max 6 lines
+        # 3. Save (unique name: concurrent posters with similar titles must not collide)
+        slug = re.sub(r'\W+', '_', title[:10]).strip('_') or "poster"
+        output_path = os.path.join(settings.TEMP_DIR, f"{slug}_{uuid.uuid4().hex[:8]}_poster.jpg")
+        with open(output_path, 'wb') as f:
+            f.write(jpeg)
 
-        for line in desc_lines:
-            draw.text((margin_x, current_y), line, font=desc_font, fill=(200, 200, 200))
-            current_y += 50
+        return output_path
 
-        # Draw Logo Watermark (Top Right)
-        try:
-            logo_path = os.path.join(settings.ASSETS_DIR, "logo", "logo.png")
-            if os.path.exists(logo_path):
-                logo = Image.open(logo_path).convert("RGBA")
-                
-                # Resize logo (e.g., width 300px, maintain aspect)
-                target_logo_width = 300
-                logo_ratio = logo.height / logo.width
-                target_logo_height = int(target_logo_width * logo_ratio)
-                logo = logo.resize((target_logo_width, target_logo_height), Image.Resampling.LANCZOS)
-                
-                # Position: Top Right with margin
-                margin = 50
-                logo_x = target_size[0] - target_logo_width - margin
-                logo_y = margin
-                
-                img.paste(logo, (logo_x, logo_y), logo)
-            else:
-                # Fallback to Text if logo file missing
-                watermark_text = "CINEGRAM 🎬"
-                wm_font_size = 60
-                wm_font = ImageFont.truetype(font_path, wm_font_size) if 'font_path' in locals() else ImageFont.load_default()
-                wm_bbox = draw.textbbox((0, 0), watermark_text, font=wm_font)
-                wm_x = target_size[0] - (wm_bbox[2] - wm_bbox[0]) - 50
-                wm_y = 50
-                draw.text((wm_x + 3, wm_y + 3), watermark_text, font=wm_font, fill="black")
-                draw.text((wm_x, wm_y), watermark_text, font=wm_font, fill=(255, 215, 0))
-                
-        except Exception as e:
-            print(f"Error adding watermark: {e}")
+    @staticmethod
+    def as_input(poster: Union[bytes, str]) -> Union[bytes, Path, str]:
+        """
+        Converts a generated poster into something send_photo accepts.
+        If these exact bytes were uploaded before, returns the Telegram file_id instead.
+        """
+        file_id = PosterCache.get_file_id(poster)
+        if file_id:
+            return file_id
+        if isinstance(poster, (bytes, bytearray, memoryview)):
+            return bytes(poster)
+        return Path(poster)
 
-        # 5. Save
-        output_path = os.path.join(settings.TEMP_DIR, f"{title[:10].replace(' ', '_')}_poster.jpg")
-        img = img.convert("RGB") # Remove alpha for JPG
-        img.save(output_path, quality=95)
-        
-        return output_path
+    @staticmethod
+    def remember_upload(poster: Union[bytes, str], message):
+        """Stores the file_id of a sent poster so the same bytes are never uploaded twice."""
+        if message and message.photo:
+            PosterCache.remember_file_id(poster, message.photo[-1].file_id)
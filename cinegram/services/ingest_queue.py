@@ -0,0 +1,245 @@
+import asyncio
+import os
+import sqlite3
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional
+from cinegram.config import settings
+from cinegram.services.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueue:
+    """
+    Persistent job queue for forwarded videos (SQLite-backed).
+    A fixed pool of workers pulls jobs in order, each pipeline stage has its own
+    concurrency limit, failed jobs are retried with backoff, and jobs left 'running'
+    by a crash or restart are picked up again on start.
+    A job is 'done' when the processor returns True (published), 'skipped' when it
+    returns anything else (nothing to publish), and retried when it raises.
+    An optional prefetcher gets the queued jobs in batches ahead of the workers, for
+    bulk work whose results the workers then find cached.
+    """
+    DB_PATH = os.path.join(settings.CACHE_DIR, "ingest_queue.sqlite3")
+
+    _conn: Optional[sqlite3.Connection] = None
+    _workers: List[asyncio.Task] = []
+    _wakeup: Optional[asyncio.Event] = None
+    _stages: Dict[str, asyncio.Semaphore] = {}
+    _processor: Optional[Callable[..., Awaitable[bool]]] = None
+    _prefetcher: Optional[Callable[[List[dict]], Awaitable[None]]] = None
+    _prefetch_wakeup: Optional[asyncio.Event] = None
+    _bot = None
+
+    @staticmethod
+    def _db() -> sqlite3.Connection:
+        if IngestQueue._conn is None:
+            conn = sqlite3.connect(IngestQueue.DB_PATH, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "chat_id INTEGER, message_id INTEGER, file_id TEXT, file_unique_id TEXT, file_name TEXT, "
+                "status TEXT DEFAULT 'queued', stage TEXT, attempts INTEGER DEFAULT 0, error TEXT, "
+                "next_run_at REAL, created_at REAL, updated_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, next_run_at, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_file ON jobs(file_unique_id)")
+            IngestQueue._conn = conn
+        return IngestQueue._conn
+
+    @staticmethod
+    def enqueue(chat_id: int, message_id: int, file_id: str, file_unique_id: str, file_name: str) -> int:
+        """Adds a video to the queue. Returns the job id."""
+        now = time.time()
+        cursor = IngestQueue._db().execute(
+            "INSERT INTO jobs (chat_id, message_id, file_id, file_unique_id, file_name, next_run_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (chat_id, message_id, file_id, file_unique_id, file_name, now, now, now)
+        )
+        if IngestQueue._wakeup:
+            IngestQueue._wakeup.set()
+        if IngestQueue._prefetch_wakeup:
+            IngestQueue._prefetch_wakeup.set()
+        return cursor.lastrowid
+
+    @staticmethod
+    def status_counts() -> Dict[str, int]:
+        rows = IngestQueue._db().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {"queued": 0, "running": 0, "done": 0, "skipped": 0, "failed": 0}
+        counts.update({row[0]: row[1] for row in rows})
+        return counts
+
+    @staticmethod
+    def find_active(file_unique_id: str) -> Optional[int]:
+        """Id of a queued or running job for the same file (a forward repeated before it was published)."""
+        row = IngestQueue._db().execute(
+            "SELECT id FROM jobs WHERE file_unique_id = ? AND status IN ('queued', 'running') LIMIT 1",
+            (file_unique_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def position(job_id: int) -> int:
+        """Number of queued jobs ahead of this one."""
+        return IngestQueue._db().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id < ?", (job_id,)
+        ).fetchone()[0]
+
+    @staticmethod
+    def set_stage(job_id: int, stage: str):
+        IngestQueue._db().execute(
+            "UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ?", (stage, time.time(), job_id)
+        )
+
+    @staticmethod
+    @asynccontextmanager
+    async def stage(name: str, job_id: Optional[int] = None):
+        """Limits how many jobs run a given stage (parse, tmdb, render, publish) at once."""
+        if name not in IngestQueue._stages:
+            limit = settings.INGEST_STAGE_LIMITS.get(name, settings.INGEST_WORKERS)
+            IngestQueue._stages[name] = asyncio.Semaphore(limit)
+        async with IngestQueue._stages[name]:
+            if job_id is not None:
+                IngestQueue.set_stage(job_id, name)
+            with Metrics.timer("video", name):
+                yield
+
+    @staticmethod
+    def _claim() -> Optional[dict]:
+        # Runs without awaiting, so two workers on the same loop can never claim the same row
+        db = IngestQueue._db()
+        row = db.execute(
+            "SELECT * FROM jobs WHERE status = 'queued' AND next_run_at <= ? ORDER BY id LIMIT 1", (time.time(),)
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+            (time.time(), row["id"])
+        )
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    @staticmethod
+    def _finish(job: dict, error: Optional[str] = None, status: str = "done"):
+        now = time.time()
+        db = IngestQueue._db()
+        if error is None:
+            db.execute("UPDATE jobs SET status = ?, error = NULL, updated_at = ? WHERE id = ?", (status, now, job["id"]))
+        elif job["attempts"] < settings.INGEST_MAX_ATTEMPTS:
+            delay = settings.INGEST_RETRY_DELAY * (2 ** (job["attempts"] - 1))
+            db.execute(
+                "UPDATE jobs SET status = 'queued', error = ?, next_run_at = ?, updated_at = ? WHERE id = ?",
+                (error, now + delay, now, job["id"])
+            )
+            logger.warning(f"Job #{job['id']} failed (attempt {job['attempts']}), retrying in {delay}s: {error}")
+            Metrics.inc("ingest_retries_total")
+        else:
+            db.execute("UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?", (error, now, job["id"]))
+            logger.error(f"Job #{job['id']} failed permanently: {error}")
+            Metrics.inc("ingest_failures_total")
+
+    @staticmethod
+    async def _worker(index: int):
+        while True:
+            job = IngestQueue._claim()
+            if job is None:
+                IngestQueue._wakeup.clear()
+                try:
+                    # Also wake up periodically for jobs waiting on a retry delay
+                    await asyncio.wait_for(IngestQueue._wakeup.wait(), timeout=settings.INGEST_RETRY_DELAY)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            Metrics.observe("video", "queue_wait", max(0.0, time.time() - job["next_run_at"]))
+            error = None
+            published = False
+            try:
+                with Metrics.timer("video", "total"):
+                    published = await IngestQueue._processor(IngestQueue._bot, job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            IngestQueue._finish(job, error, "done" if published is True else "skipped")
+            if error and job["attempts"] >= settings.INGEST_MAX_ATTEMPTS:
+                await IngestQueue._notify_failure(job, error)
+
+    @staticmethod
+    async def _prefetch_loop():
+        last_id = 0
+        while True:
+            IngestQueue._prefetch_wakeup.clear()
+            rows = IngestQueue._db().execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND id > ? ORDER BY id LIMIT ?",
+                (last_id, settings.INGEST_PREFETCH_BATCH)
+            ).fetchall()
+            if not rows:
+                await IngestQueue._prefetch_wakeup.wait()
+                # A forwarded batch arrives as one update per video: let it pile up into one batch
+                await asyncio.sleep(settings.INGEST_PREFETCH_DELAY)
+                continue
+
+            jobs = [dict(row) for row in rows]
+            last_id = jobs[-1]["id"]
+            try:
+                with Metrics.timer("video", "prefetch"):
+                    await IngestQueue._prefetcher(jobs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Only a warm-up: the workers do the real work (and retries) anyway
+                logger.warning(f"Prefetch of {len(jobs)} jobs failed: {e}")
+
+    @staticmethod
+    async def _notify_failure(job: dict, error: str):
+        try:
+            await IngestQueue._bot.send_message(
+                chat_id=job["chat_id"],
+                text=f"❌ No pude procesar '{job['file_name']}' tras {job['attempts']} intentos: {error}",
+                reply_to_message_id=job["message_id"]
+            )
+        except Exception as e:
+            logger.error(f"Could not notify failure of job #{job['id']}: {e}")
+
+    @staticmethod
+    def start(bot, processor: Callable[..., Awaitable[bool]],
+              prefetcher: Optional[Callable[[List[dict]], Awaitable[None]]] = None):
+        """
+        Starts the worker pool. processor(bot, job) runs the pipeline for one job and returns True if it published.
+        prefetcher(jobs), if given, runs on batches of up to INGEST_PREFETCH_BATCH queued jobs.
+        """
+        IngestQueue._bot = bot
+        IngestQueue._processor = processor
+        IngestQueue._prefetcher = prefetcher
+        IngestQueue._wakeup = asyncio.Event()
+        IngestQueue._prefetch_wakeup = asyncio.Event()
+        IngestQueue._stages = {}
+
+        # Resume after restart: anything left 'running' was interrupted
+        resumed = IngestQueue._db().execute(
+            "UPDATE jobs SET status = 'queued', next_run_at = ? WHERE status = 'running'", (time.time(),)
+        ).rowcount
+        if resumed:
+            logger.info(f"Resuming {resumed} interrupted ingest jobs.")
+
+        IngestQueue._workers = [
+            asyncio.create_task(IngestQueue._worker(i)) for i in range(settings.INGEST_WORKERS)
+        ]
+        if prefetcher and settings.INGEST_PREFETCH_BATCH > 0:
+            IngestQueue._workers.append(asyncio.create_task(IngestQueue._prefetch_loop()))
+        IngestQueue._wakeup.set()
+        logger.info(f"Ingest queue started with {settings.INGEST_WORKERS} workers.")
+
+    @staticmethod
+    async def stop():
+        for task in IngestQueue._workers:
+            task.cancel()
+        await asyncio.gather(*IngestQueue._workers, return_exceptions=True)
+        IngestQueue._workers = []
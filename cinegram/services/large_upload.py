@@ -0,0 +1,189 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Union
+import httpx
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter, TelegramError
+from cinegram.config import settings
+from cinegram.services.http_client import HttpClient
+
+logger = logging.getLogger(__name__)
+
+
+class UploadProgress:
+    """Bytes moved so far for one transfer; report() turns it into periodic status edits."""
+
+    def __init__(self):
+        self.phase = "download"
+        self.done = 0
+        self.total: Optional[int] = None
+        self.started = time.monotonic()
+
+    def update(self, phase: str, done: int, total: Optional[int]):
+        if phase != self.phase:
+            self.started = time.monotonic()
+        self.phase, self.done, self.total = phase, done, total
+
+    def text(self) -> str:
+        label = "⬇️ Descargando" if self.phase == "download" else "📤 Subiendo"
+        speed = self.done / max(time.monotonic() - self.started, 0.001) / 1024 / 1024
+        if self.total:
+            return (f"{label}: {self.done * 100 // self.total}% "
+                    f"({self.done // 1024 // 1024}/{self.total // 1024 // 1024} MB, {speed:.1f} MB/s)")
+        return f"{label}: {self.done // 1024 // 1024} MB ({speed:.1f} MB/s)"
+
+    async def report(self, send: Callable[[str], Awaitable], interval: Optional[float] = None):
+        """Calls send(text) every interval seconds while the text changes (run as a task, cancel when done)."""
+        last = None
+        while True:
+            await asyncio.sleep(interval or settings.UPLOAD_PROGRESS_INTERVAL)
+            text = self.text()
+            if text != last:
+                try:
+                    await send(text)
+                    last = text
+                except TelegramError as e:
+                    logger.debug(f"Progress update failed: {e}")
+
+
+class _ProgressReader:
+    """File wrapper that counts the bytes httpx reads while it streams the multipart body."""
+
+    def __init__(self, f, progress: Optional[UploadProgress], total: int):
+        self._file = f
+        self._progress = progress
+        self._total = total
+        self._done = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._file.read(size)
+        self._done += len(chunk)
+        if self._progress:
+            self._progress.update("upload", self._done, self._total)
+        return chunk
+
+    def seek(self, offset: int, whence: int = 0):
+        self._done = self._file.seek(offset, whence)
+        return self._done
+
+    def fileno(self) -> int:
+        return self._file.fileno() # Lets httpx send a Content-Length instead of chunked encoding
+
+
+class LargeUpload:
+    """
+    Publishes multi-GB videos through a self-hosted Bot API server with bounded memory:
+    - HTTP sources are streamed to UPLOAD_DIR chunk by chunk (never held in RAM).
+    - Local mode: the server reads the file from disk itself (file:// path, no upload at all).
+    - Otherwise the file is streamed to the server as multipart (PTB would buffer it whole).
+    At most UPLOAD_CONCURRENCY transfers run at once.
+    """
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(settings.BOT_API_BASE_URL)
+
+    @staticmethod
+    def _limit() -> asyncio.Semaphore:
+        if LargeUpload._semaphore is None:
+            LargeUpload._semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+        return LargeUpload._semaphore
+
+    @staticmethod
+    async def download_to_disk(url: str, progress: Optional[UploadProgress] = None) -> str:
+        """Streams url into UPLOAD_DIR and returns the path. Raises httpx.HTTPError or ValueError (too large)."""
+        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+        name = os.path.basename(url.split('?', 1)[0]) or "video.mp4"
+        path = os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4().hex[:8]}_{name}")
+        timeout = httpx.Timeout(settings.HTTP_TIMEOUT * 4, connect=settings.HTTP_CONNECT_TIMEOUT)
+        try:
+            async with HttpClient.stream("GET", url, timeout=timeout) as response:
+                response.raise_for_status()
+                total = int(response.headers.get("Content-Length") or 0) or None
+                if total and total > settings.BOT_API_MAX_UPLOAD_BYTES:
+                    raise ValueError(f"{total} bytes is over the upload limit")
+                done = 0
+                with open(path, 'wb') as f:
+                    async for chunk in response.aiter_bytes(settings.UPLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                        done += len(chunk)
+                        if done > settings.BOT_API_MAX_UPLOAD_BYTES:
+                            raise ValueError(f"Download exceeded {settings.BOT_API_MAX_UPLOAD_BYTES} bytes")
+                        if progress:
+                            progress.update("download", done, total)
+            return path
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+
+    @staticmethod
+    async def _multipart_upload(bot, method: str, field: str, path: str,
+                                progress: Optional[UploadProgress], params: dict) -> Message:
+        """
+        Streams the file to the server (httpx reads it in small chunks), bypassing PTB's in-memory InputFile.
+        Goes through the bot's rate limiter (SendScheduler) like any other call, so a 429 is raised
+        as RetryAfter and pauses every sender.
+        """
+        url = f"{settings.BOT_API_BASE_URL}{bot.token}/{method}"
+        # Form values are JSON like PTB sends them (True -> 'true'), plain strings as they are
+        data = {
+            key: value if isinstance(value, str) else json.dumps(value.to_dict() if hasattr(value, "to_dict") else value)
+            for key, value in params.items() if value is not None
+        }
+        total = os.path.getsize(path)
+
+        async def upload() -> Message:
+            with open(path, 'rb') as f:
+                files = {field: (os.path.basename(path), _ProgressReader(f, progress, total), "video/mp4")}
+                response = await HttpClient.post(
+                    url, data=data, files=files,
+                    timeout=httpx.Timeout(None, connect=settings.HTTP_CONNECT_TIMEOUT) # Multi-GB body
+                )
+
+            result = response.json()
+            if not result.get("ok"):
+                description = result.get("description", f"HTTP {response.status_code}")
+                if response.status_code == 429:
+                    raise RetryAfter(result.get("parameters", {}).get("retry_after", 1))
+                raise BadRequest(description) if response.status_code == 400 else TelegramError(description)
+            return Message.de_json(result["result"], bot)
+
+        limiter = getattr(bot, "rate_limiter", None)
+        if limiter is None:
+            return await upload()
+        return await limiter.process_request(
+            callback=upload, args=(), kwargs={}, endpoint=method,
+            data={"chat_id": params.get("chat_id")}, rate_limit_args=None
+        )
+
+    @staticmethod
+    async def send_video(bot, chat_id: Union[int, str], source: Union[str, Path],
+                         progress: Optional[UploadProgress] = None, **kwargs) -> Message:
+        """
+        Sends a video from a local path or an http(s) URL through the self-hosted server.
+        Extra kwargs (caption, parse_mode, reply_markup, supports_streaming...) go to sendVideo.
+        """
+        async with LargeUpload._limit():
+            downloaded = None
+            path = str(source)
+            if path.startswith(("http://", "https://")):
+                downloaded = path = await LargeUpload.download_to_disk(path, progress)
+            try:
+                if settings.BOT_API_LOCAL_MODE:
+                    # PTB sends file:///path in local mode: the server reads the file from the shared disk
+                    if progress:
+                        progress.update("upload", 0, None)
+                    return await bot.send_video(chat_id=chat_id, video=Path(path), read_timeout=600, **kwargs)
+                return await LargeUpload._multipart_upload(
+                    bot, "sendVideo", "video", path, progress, {"chat_id": chat_id, **kwargs}
+                )
+            finally:
+                if downloaded and os.path.exists(downloaded):
+                    os.remove(downloaded)
@@ -1,50 +1,80 @@
 from typing import Dict, Optional
+from urllib.parse import quote
+from cinegram.config import settings
+from cinegram.services.archive_service import ArchiveService
+from cinegram.services.tmdb_service import TmdbService
 
 class MetadataParser:
+    @staticmethod
+    def select_video(item: dict, max_bytes: int) -> Optional[list]:
+        """
+        Best playable derivative Telegram can fetch by URL: the largest MP4 (= best quality)
+        of at most max_bytes. Files without a known size are skipped. Returns [name, format, size].
+        """
+        best = None
+        for position in item['extensions'].get('mp4', []):
+            name, file_format, size = item['files'][position]
+            if size is None or size > max_bytes:
+                continue
+            if best is None or size > best[2]:
+                best = item['files'][position]
+        return best
+
     @staticmethod
     def parse(data: dict, tmdb_data: Optional[Dict] = None) -> Optional[Dict]:
         """
-        Parses raw IA metadata into a standardized dictionary.
+        Parses IA metadata (compact item or raw JSON) into a standardized dictionary.
         Optionally merges with TMDB data (TMDB takes precedence for text/image).
         """
         if not data or 'metadata' not in data:
             return None
 
-        metadata = data['metadata']
-        files = data.get('files', [])
-        server = data.get('server')
-        dir_path = data.get('dir')
+        # Compact item (ArchiveService.get_item); raw IA JSON is compacted here
+        item = data if 'formats' in data else ArchiveService.compact_item(data)
+        metadata = item['metadata']
+        files = item['files']
+        server = item.get('server')
+        dir_path = item.get('dir')
 
         # 1. Base IA Data
         ia_title = metadata.get("title", "Unknown Title")
         ia_year = metadata.get("date", "Unknown Year")[:4]
         ia_description = metadata.get("description", "No description available.")
         
-        # 2. Extract IA Image (Improved Fallback)
+        # 2. Extract IA Image (Improved Fallback, index lookups instead of scanning every file)
         poster_path = None
         # Priority 1: Specifically marked images
-        for f in files:
-            if f.get('format') in ['JPEG', 'PNG', 'Thumbnail'] and 'thumb' not in f.get('name', '').lower():
-                poster_path = f['name']
+        candidates = sorted(
+            position for file_format in ('JPEG', 'PNG', 'Thumbnail')
+            for position in item['formats'].get(file_format, [])
+        )
+        for position in candidates:
+            if 'thumb' not in files[position][0].lower():
+                poster_path = files[position][0]
                 break
         
         # Priority 2: Item Image default
-        if not poster_path:
-             for f in files:
-                if f.get('format') == 'Item Image':
-                    poster_path = f['name']
-                    break
+        if not poster_path and item['formats'].get('Item Image'):
+            poster_path = files[item['formats']['Item Image'][0]][0]
         
         # Priority 3: Any JPEG/PNG that isn't a spectrogram or xml
         if not poster_path:
-            for f in files:
-                name = f.get('name', '').lower()
-                if (name.endswith('.jpg') or name.endswith('.png')) and 'spectrogram' not in name:
-                    poster_path = f['name']
+            candidates = sorted(item['extensions'].get('jpg', []) + item['extensions'].get('png', []))
+            for position in candidates:
+                if 'spectrogram' not in files[position][0].lower():
+                    poster_path = files[position][0]
                     break
 
         ia_poster_url = f"https://{server}{dir_path}/{poster_path}" if poster_path and server and dir_path else None
 
+        # 2b. Direct video file. Cloud Bot API: sent by URL (Telegram downloads it, nothing goes
+        # through our host, 20 MB max). Self-hosted server: streamed upload of up to 2000 MB.
+        video_url = None
+        max_bytes = settings.BOT_API_MAX_UPLOAD_BYTES if settings.BOT_API_BASE_URL else settings.TG_URL_VIDEO_MAX_BYTES
+        video = MetadataParser.select_video(item, max_bytes)
+        if video and metadata.get("identifier"):
+            video_url = f"https://archive.org/download/{metadata['identifier']}/{quote(video[0])}"
+
         # 3. Merge with TMDB (if available)
         final_title = ia_title
         final_year = ia_year
@@ -60,15 +90,13 @@ class MetadataParser:
             final_description = tmdb_data.get('overview') or final_description
             if tmdb_data.get('poster_path'):
                 # TMDB posters are high quality, prefer them
-                from cinegram.services.tmdb_service import TmdbService
-                final_poster_url = TmdbService.get_poster_url(tmdb_data['poster_path'])
+                final_poster_url = TmdbService.get_artwork_url(tmdb_data)
             
             # Genres from TMDB are IDs, we need to convert them (handled in service usually, but let's assume we passed raw)
             # Or assume service passed friendly names. 
             # In our service implementation we added get_genres helper but returned raw dict.
             # Let's use the helper here if we can import it, or just rely on IA subject if complex.
             # Actually, let's just use IA subject as fallback if TMDB genre is missing/complex to parse here.
-            from cinegram.services.tmdb_service import TmdbService
             if tmdb_data.get('genre_ids'):
                  final_genre = TmdbService.get_genres(tmdb_data['genre_ids'])
             
@@ -82,5 +110,6 @@ class MetadataParser:
             "language": metadata.get("language", "Unknown"),
             "description": final_description,
             "poster_url": final_poster_url,
+            "video_url": video_url,
             "rating": rating
         }
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from cinegram.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class Metrics:
+    """
+    In-process metrics:
+    - Stage latencies per (flow, stage): totals plus a window of the last METRICS_WINDOW
+      samples for percentiles (flows: video, archive, external, services, telegram, http).
+    - Counters (upstream errors, retries...).
+    - Gauges read at scrape time (queue depths, cache hit rates).
+    Exposed as Prometheus text on METRICS_HOST:METRICS_PORT/metrics and summarized by /stats.
+    """
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    _samples: Dict[Tuple[str, str], deque] = {}
+    _totals: Dict[Tuple[str, str], List[float]] = {}  # [count, sum]
+    _counters: Dict[Tuple[str, Tuple], float] = defaultdict(float)
+    _gauges: Dict[str, Tuple[Callable[[], Any], Optional[str]]] = {}
+    _server: Optional[asyncio.AbstractServer] = None
+
+    @staticmethod
+    def observe(flow: str, stage: str, seconds: float):
+        key = (flow, stage)
+        if key not in Metrics._samples:
+            Metrics._samples[key] = deque(maxlen=settings.METRICS_WINDOW)
+            Metrics._totals[key] = [0, 0.0]
+        Metrics._samples[key].append(seconds)
+        Metrics._totals[key][0] += 1
+        Metrics._totals[key][1] += seconds
+
+    @staticmethod
+    @contextmanager
+    def timer(flow: str, stage: str):
+        """Times a block (works in async code too); an exception also counts as a stage error."""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            Metrics.inc("stage_errors_total", flow=flow, stage=stage)
+            raise
+        finally:
+            Metrics.observe(flow, stage, time.perf_counter() - started)
+
+    @staticmethod
+    def inc(name: str, value: float = 1, **labels):
+        Metrics._counters[(name, tuple(sorted(labels.items())))] += value
+
+    @staticmethod
+    def register_gauge(name: str, read: Callable[[], Any], label: Optional[str] = None):
+        """read() returns a number, or {label value: number} when label is given."""
+        Metrics._gauges[name] = (read, label)
+
+    @staticmethod
+    def percentile(samples: List[float], quantile: float) -> float:
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))] if ordered else 0.0
+
+    @staticmethod
+    def stage_summary() -> List[Dict[str, Any]]:
+        """Per stage: count, mean and percentiles (seconds), plus error count."""
+        summary = []
+        for (flow, stage), samples in sorted(Metrics._samples.items()):
+            count, total = Metrics._totals[(flow, stage)]
+            window = list(samples)
+            summary.append({
+                "flow": flow,
+                "stage": stage,
+                "count": int(count),
+                "mean": total / count if count else 0.0,
+                **{f"p{int(q * 100)}": Metrics.percentile(window, q) for q in Metrics.QUANTILES},
+                "errors": int(Metrics._counters.get(("stage_errors_total", (("flow", flow), ("stage", stage))), 0))
+            })
+        return summary
+
+    @staticmethod
+    def counters() -> Dict[str, float]:
+        return {f"{name}{_labels(dict(labels))}": value for (name, labels), value in sorted(Metrics._counters.items())}
+
+    @staticmethod
+    def gauges() -> Dict[str, float]:
+        values = {}
+        for name, (read, label) in Metrics._gauges.items():
+            try:
+                result = read()
+            except Exception as e:
+                logger.warning(f"Gauge {name} failed: {e}")
+                continue
+            if label:
+                for label_value, value in result.items():
+                    values[f"{name}{_labels({label: label_value})}"] = value
+            else:
+                values[name] = result
+        return values
+
+    @staticmethod
+    def render_prometheus() -> str:
+        """Prometheus text exposition format (v0.0.4)."""
+        lines = [
+            "# HELP cinegram_stage_seconds Stage latency (quantiles over the recent window).",
+            "# TYPE cinegram_stage_seconds summary"
+        ]
+        for (flow, stage), samples in sorted(Metrics._samples.items()):
+            window = list(samples)
+            for quantile in Metrics.QUANTILES:
+                labels = _labels({"flow": flow, "stage": stage, "quantile": quantile})
+                lines.append(f"cinegram_stage_seconds{labels} {Metrics.percentile(window, quantile):.6f}")
+            count, total = Metrics._totals[(flow, stage)]
+            labels = _labels({"flow": flow, "stage": stage})
+            lines.append(f"cinegram_stage_seconds_sum{labels} {total:.6f}")
+            lines.append(f"cinegram_stage_seconds_count{labels} {int(count)}")
+
+        typed = set()
+        for (name, labels), value in sorted(Metrics._counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE cinegram_{name} counter")
+                typed.add(name)
+            lines.append(f"cinegram_{name}{_labels(dict(labels))} {value:g}")
+
+        for series, value in Metrics.gauges().items():
+            name = series.split("{", 1)[0]
+            if name not in typed:
+                lines.append(f"# TYPE cinegram_{name} gauge")
+                typed.add(name)
+            lines.append(f"cinegram_{series} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Minimal HTTP/1.0 responder: GET /metrics only (bound to localhost by default)
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.split()
+            if len(parts) > 1 and parts[1].split(b"?")[0] == b"/metrics":
+                status, body = "200 OK", Metrics.render_prometheus().encode('utf-8')
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('ascii') + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def start_server():
+        Metrics._server = await asyncio.start_server(Metrics._handle_http, settings.METRICS_HOST, settings.METRICS_PORT)
+        logger.info(f"Metrics on http://{settings.METRICS_HOST}:{settings.METRICS_PORT}/metrics")
+
+    @staticmethod
+    async def stop_server():
+        if Metrics._server is not None:
+            Metrics._server.close()
+            await Metrics._server.wait_closed()
+            Metrics._server = None
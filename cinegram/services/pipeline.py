@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable
+from cinegram.services.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Pipeline:
+    """
+    Small DAG runner. Each stage is a coroutine function that receives the results
+    of the stages it depends on; stages without a dependency between them run
+    concurrently, so the total latency is the critical path, not the sum.
+    Per-stage times (excluding the wait for dependencies) are logged at the end
+    and recorded in Metrics under the flow (the name up to ':', e.g. 'archive').
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.flow = name.split(":", 1)[0]
+        self.timings: Dict[str, float] = {}
+        self._stages: Dict[str, tuple] = {}  # name -> (func, dependencies)
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def add(self, name: str, func: Callable[..., Awaitable[Any]], depends_on: Iterable[str] = ()):
+        self._stages[name] = (func, tuple(depends_on))
+
+    async def result(self, name: str) -> Any:
+        """Result of another stage. Also for dependencies only known at run time."""
+        return await asyncio.shield(self._tasks[name])
+
+    def cancel(self, name: str):
+        """Drops a speculative stage (and its dependents) whose result is no longer needed."""
+        task = self._tasks.get(name)
+        if task and not task.done():
+            task.cancel()
+
+    async def _run_stage(self, name: str) -> Any:
+        func, dependencies = self._stages[name]
+        args = [await self.result(dependency) for dependency in dependencies]
+        with Metrics.timer(self.flow, name):
+            started = time.perf_counter()
+            try:
+                return await func(*args)
+            finally:
+                self.timings[name] = time.perf_counter() - started
+
+    async def run(self) -> Dict[str, Any]:
+        """Runs every stage. Returns {stage: result} (None for cancelled stages); the first error is raised."""
+        started = time.perf_counter()
+        self._tasks = {
+            name: asyncio.create_task(self._run_stage(name), name=f"{self.name}:{name}")
+            for name in self._stages
+        }
+        pending = set(self._tasks.values())
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    if not task.cancelled() and task.exception():
+                        raise task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+            self.timings["total"] = time.perf_counter() - started
+            logger.info(f"{self.name} stages: " + ", ".join(
+                f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in self.timings.items()
+            ))
+
+        return {name: None if task.cancelled() else task.result() for name, task in self._tasks.items()}
@@ -0,0 +1,134 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from typing import Optional, Union
+from cinegram.config import settings
+from cinegram.services.cache_store import CacheStore
+
+logger = logging.getLogger(__name__)
+
+
+class DiskLRU:
+    """
+    Content-addressed blob store on disk. A file's mtime is its "last used" time;
+    once the directory grows past max_bytes the least recently used files are removed.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None  # Total bytes on disk, computed on first write
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path) # Mark as recently used
+            self.hits += 1
+            return data
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path) # Atomic: readers never see half-written files
+        except OSError as e:
+            logger.error(f"Disk cache write failed ({self.directory}): {e}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".tmp"):
+                    yield os.path.join(root, name)
+
+    def _scan_size(self) -> int:
+        return sum(os.path.getsize(p) for p in self._files())
+
+    def _evict(self):
+        # Remove oldest files until we're back under 90% of the limit
+        files = []
+        for path in self._files():
+            try:
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                pass
+        files.sort()
+        size = sum(f[1] for f in files)
+        target = self.max_bytes * 0.9
+        for _, file_size, path in files:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                size -= file_size
+            except OSError:
+                pass
+        self._size = size
+
+
+class PosterCache:
+    """
+    Caches for the poster pipeline:
+    - artwork: downloaded source images, keyed by URL
+    - posters: rendered JPEGs, keyed by URL + title + description + template version + size
+    - file_ids: Telegram file_id of every uploaded poster, keyed by the JPEG's content hash
+    """
+    artwork = DiskLRU(os.path.join(settings.CACHE_DIR, "artwork"), settings.ARTWORK_CACHE_MAX_MB * 1024 * 1024)
+    posters = DiskLRU(os.path.join(settings.CACHE_DIR, "posters"), settings.POSTER_CACHE_MAX_MB * 1024 * 1024)
+    file_ids = CacheStore("poster_file_ids", ttl=365 * 24 * 3600)
+
+    @staticmethod
+    def _hash(*parts: str) -> str:
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def artwork_key(image_url: str) -> str:
+        return PosterCache._hash(image_url)
+
+    @staticmethod
+    def poster_key(image_url: str, title: str, description: str) -> str:
+        from cinegram.services.poster_renderer import PosterRenderer # Pulls in Pillow: not needed at startup
+        description_hash = hashlib.sha256(description.encode("utf-8")).hexdigest()
+        size = "x".join(str(v) for v in settings.IMAGE_SIZE)
+        return PosterCache._hash(image_url, title, description_hash, str(PosterRenderer.TEMPLATE_VERSION), size)
+
+    @staticmethod
+    def content_hash(poster: Union[bytes, str]) -> str:
+        if isinstance(poster, (bytes, bytearray, memoryview)):
+            return hashlib.sha256(poster).hexdigest()
+        with open(poster, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    @staticmethod
+    def get_file_id(poster: Union[bytes, str]) -> Optional[str]:
+        file_id = PosterCache.file_ids.get(PosterCache.content_hash(poster))
+        return None if file_id is CacheStore.MISS else file_id
+
+    @staticmethod
+    def remember_file_id(poster: Union[bytes, str], file_id: str):
+        PosterCache.file_ids.set(PosterCache.content_hash(poster), file_id)
@@ -0,0 +1,139 @@
+import os
+import logging
+import textwrap
+from typing import Dict, Optional, Tuple
+from PIL import Image, ImageDraw, ImageFont
+from cinegram.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PosterRenderer:
+    """
+    Renders the poster layout onto a source image.
+    Everything that doesn't depend on the movie (gradient overlay, fonts, resized logo)
+    is built once per size/config and reused for every poster.
+    """
+    # Bump whenever the layout changes: it is part of the rendered-poster cache key
+    TEMPLATE_VERSION = 1
+    _instances: Dict[Tuple, "PosterRenderer"] = {}
+
+    def __init__(self, size: Tuple[int, int], font_path: str, logo_path: str):
+        self.size = size
+        self.font_path = font_path
+        self.logo_path = logo_path
+        self.overlay = self._build_gradient()
+        self.title_font, self.desc_font, self.wm_font = self._load_fonts()
+        self.logo = self._load_logo()
+
+    @staticmethod
+    def get(size: Optional[Tuple[int, int]] = None) -> "PosterRenderer":
+        """Returns the shared renderer for the current settings."""
+        size = tuple(size or settings.IMAGE_SIZE)
+        logo_path = os.path.join(settings.ASSETS_DIR, "logo", "logo.png")
+        key = (size, settings.DEFAULT_FONT_PATH, logo_path)
+        if key not in PosterRenderer._instances:
+            PosterRenderer._instances[key] = PosterRenderer(size, settings.DEFAULT_FONT_PATH, logo_path)
+        return PosterRenderer._instances[key]
+
+    def _build_gradient(self) -> Image.Image:
+        # Gradient from bottom 60% to bottom: one column of alpha values stretched to full width
+        width, height = self.size
+        start = height * 0.4
+        column = bytes(
+            int(255 * ((y - start) / (height * 0.6))) if y >= int(start) else 0
+            for y in range(height)
+        )
+        alpha = Image.frombytes("L", (1, height), column).resize(self.size, Image.Resampling.NEAREST)
+        overlay = Image.new("RGBA", self.size, (0, 0, 0, 0))
+        overlay.putalpha(alpha)
+        return overlay
+
+    def _load_fonts(self):
+        try:
+            # Try configured font, fallback to Arial if on Windows/generic
+            font_path = self.font_path
+            if not os.path.exists(font_path):
+                font_path = "arial.ttf" # Common on Windows
+
+            return (
+                ImageFont.truetype(font_path, 80),
+                ImageFont.truetype(font_path, 40),
+                ImageFont.truetype(font_path, 60)
+            )
+        except IOError:
+            # Fallback to default if load fails
+            default = ImageFont.load_default()
+            return default, default, default
+
+    def _load_logo(self) -> Optional[Image.Image]:
+        if not os.path.exists(self.logo_path):
+            return None
+        try:
+            logo = Image.open(self.logo_path).convert("RGBA")
+            # Resize logo (e.g., width 300px, maintain aspect)
+            target_logo_width = 300
+            logo_ratio = logo.height / logo.width
+            target_logo_height = int(target_logo_width * logo_ratio)
+            return logo.resize((target_logo_width, target_logo_height), Image.Resampling.LANCZOS)
+        except Exception as e:
+            logger.warning(f"Error loading logo {self.logo_path}: {e}")
+            return None
+
+    def render(self, img: Image.Image, title: str, description: str) -> Image.Image:
+        """Composes the final poster. Returns an RGB image ready to encode."""
+        target_size = self.size
+
+        # 1. Resize/Crop to target size (Aspect Fill)
+        # Only the visible (center-cropped) region is resampled, and in RGB: resizing the
+        # whole artwork first is by far the most expensive step of a poster.
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        scale = max(target_size[0] / img.width, target_size[1] / img.height)
+        crop_width = target_size[0] / scale
+        crop_height = target_size[1] / scale
+        left = (img.width - crop_width) / 2
+        top = (img.height - crop_height) / 2
+        img = img.resize(
+            target_size,
+            Image.Resampling.LANCZOS,
+            box=(left, top, left + crop_width, top + crop_height)
+        ).convert("RGBA")
+
+        # 2. Dark Overlay (cached gradient)
+        img = Image.alpha_composite(img, self.overlay)
+
+        # 3. Add Text
+        draw = ImageDraw.Draw(img)
+        margin_x = 100
+
+        # Draw Title
+        title_lines = textwrap.wrap(title, width=25)
+        current_y = target_size[1] - 350 # Start from bottom-ish area
+        for line in title_lines:
+            draw.text((margin_x, current_y), line, font=self.title_font, fill="white")
+            current_y += 90 # Line height
+
+        # Draw Description (Synopsis)
+        current_y += 20
+        clean_desc = (description[:300] + '...') if len(description) > 300 else description
+        desc_lines = textwrap.wrap(clean_desc, width=70)[:6] # Max 6 lines
+
+        for line in desc_lines:
+            draw.text((margin_x, current_y), line, font=self.desc_font, fill=(200, 200, 200))
+            current_y += 50
+
+        # 4. Logo Watermark (Top Right)
+        margin = 50
+        if self.logo is not None:
+            logo_x = target_size[0] - self.logo.width - margin
+            img.paste(self.logo, (logo_x, margin), self.logo)
+        else:
+            # Fallback to Text if logo file missing
+            watermark_text = "CINEGRAM 🎬"
+            wm_bbox = draw.textbbox((0, 0), watermark_text, font=self.wm_font)
+            wm_x = target_size[0] - (wm_bbox[2] - wm_bbox[0]) - margin
+            draw.text((wm_x + 3, margin + 3), watermark_text, font=self.wm_font, fill="black")
+            draw.text((wm_x, margin), watermark_text, font=self.wm_font, fill=(255, 215, 0))
+
+        return img.convert("RGB") # Remove alpha for JPG
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Optional, Tuple
+from cinegram.config import settings
+from cinegram.services.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    # Spawned workers start without logging configured: log like the bot (to the inherited stderr)
+    if multiprocessing.parent_process() is not None and not logging.getLogger().handlers:
+        logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    # Build the cached layers (gradient, fonts, logo) once per worker process
+    from cinegram.services.poster_renderer import PosterRenderer
+    PosterRenderer.get()
+
+
+def render_job_timed(image_bytes: Optional[bytes], title: str, description: str,
+                     size: Tuple[int, int]) -> Tuple[bytes, float, float, Optional[str]]:
+    """
+    Decodes the source artwork, composes the poster and encodes it as JPEG.
+    Runs inside a worker process, so it only takes and returns picklable data.
+    Returns (jpeg, decode + compose seconds, encode seconds, artwork error); the parent
+    logs the error and feeds the times to the metrics.
+    """
+    # Pillow is only imported where rendering happens (worker processes), not by the bot at startup
+    from PIL import Image
+    from cinegram.services.poster_renderer import PosterRenderer
+
+    started = time.perf_counter()
+    error = None
+    try:
+        img = Image.open(BytesIO(image_bytes)) if image_bytes else None
+        if img is not None:
+            if img.format == "JPEG":
+                # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when that still covers the canvas
+                scale = max(size[0] / img.width, size[1] / img.height)
+                img.draft("RGB", (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+            img.load()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        img = None
+
+    if img is None:
+        # Create a black placeholder if image download/decode fails
+        img = Image.new("RGB", size, (0, 0, 0))
+
+    poster = PosterRenderer.get(size).render(img, title, description)
+    rendered = time.perf_counter()
+    buffer = BytesIO()
+    poster.save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue(), rendered - started, time.perf_counter() - rendered, error
+
+
+class RenderPool:
+    """
+    Runs poster rendering off the event loop, in a pool of worker processes
+    (RENDER_WORKERS; 0 = a single background thread).
+    At most RENDER_QUEUE_LIMIT jobs are queued or running; further callers wait (backpressure).
+    """
+    _executor: Optional[Executor] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    def _get_executor() -> Executor:
+        if RenderPool._executor is None:
+            workers = settings.RENDER_WORKERS
+            if workers > 0:
+                # 'spawn' avoids forking a process that already runs threads and an event loop
+                RenderPool._executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+            else:
+                RenderPool._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+            logger.info(f"Render pool started ({workers or 'thread'} workers).")
+        return RenderPool._executor
+
+    @staticmethod
+    def _discard(executor: Executor):
+        # Only the first caller to see the broken pool replaces it; the others reuse the new one
+        if RenderPool._executor is executor:
+            RenderPool._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    async def _run(*args):
+        loop = asyncio.get_running_loop()
+        executor = RenderPool._get_executor()
+        try:
+            return await loop.run_in_executor(executor, render_job_timed, *args)
+        except BrokenProcessPool as e:
+            # A worker died (e.g. OOM on huge artwork) and the pool refuses all work: retry once on a fresh one
+            logger.warning(f"Render pool broken ({e}), starting a new one.")
+            RenderPool._discard(executor)
+            return await loop.run_in_executor(RenderPool._get_executor(), render_job_timed, *args)
+
+    @staticmethod
+    async def render(image_bytes: Optional[bytes], title: str, description: str) -> bytes:
+        """Renders a poster in the pool. Returns the encoded JPEG bytes."""
+        if RenderPool._semaphore is None:
+            RenderPool._semaphore = asyncio.Semaphore(settings.RENDER_QUEUE_LIMIT)
+
+        queued = time.perf_counter()
+        async with RenderPool._semaphore:
+            jpeg, render_seconds, encode_seconds, error = await RenderPool._run(
+                image_bytes, title, description, tuple(settings.IMAGE_SIZE)
+            )
+        if error:
+            # Broken artwork: the poster was rendered on a black background
+            logger.warning(f"Error loading image for '{title}': {error}")
+            Metrics.inc("render_artwork_errors_total")
+        # Everything that wasn't work: waiting for a free slot, executor queueing, IPC
+        Metrics.observe("services", "render_wait", time.perf_counter() - queued - render_seconds - encode_seconds)
+        Metrics.observe("services", "render", render_seconds)
+        Metrics.observe("services", "encode", encode_seconds)
+        return jpeg
+
+    @staticmethod
+    async def warm_up():
+        """Starts the workers and builds their fonts/gradient/logo layers ahead of the first poster."""
+        loop = asyncio.get_running_loop()
+        executor = RenderPool._get_executor()
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, _init_worker) for _ in range(max(1, settings.RENDER_WORKERS))
+        ))
+
+    @staticmethod
+    def shutdown():
+        if RenderPool._executor is not None:
+            RenderPool._executor.shutdown(wait=False, cancel_futures=True)
+            RenderPool._executor = None
+        RenderPool._semaphore = None
@@ -0,0 +1,173 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Dict, Optional
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from cinegram.config import settings
+from cinegram.services.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+# Priorities (lower runs first)
+PRIORITY_PUBLISH = 0 # Posts to the channel
+PRIORITY_REPLY = 1 # Status replies to users
+
+
+class TokenBucket:
+    """Classic token bucket: 'rate' tokens per second, bursts up to 'capacity'."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = None
+
+    def _refill(self, now: float):
+        if self.updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class SendScheduler(BaseRateLimiter):
+    """
+    Central outbound scheduler for every Bot API call (installed with ApplicationBuilder.rate_limiter).
+    - Global token bucket (TG_GLOBAL_RATE msgs/sec) plus one bucket per chat
+      (TG_PRIVATE_CHAT_RATE/sec for users, TG_GROUP_CHAT_PER_MINUTE for groups and channels).
+    - A RetryAfter from Telegram pauses *all* senders, and the request is retried.
+    - Channel publications get the global tokens before status replies.
+    """
+
+    def __init__(self):
+        self._global = TokenBucket(settings.TG_GLOBAL_RATE, settings.TG_GLOBAL_RATE)
+        self._chats: Dict[Any, TokenBucket] = {}
+        self._chat_locks: Dict[Any, asyncio.Lock] = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond: Optional[asyncio.Condition] = None
+        self._paused_until = 0.0
+        self.sent = 0
+        self.retry_after_count = 0
+
+    async def initialize(self) -> None:
+        self._cond = asyncio.Condition()
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        if chat_id not in self._chats:
+            is_private = isinstance(chat_id, int) and chat_id > 0
+            if is_private:
+                bucket = TokenBucket(settings.TG_PRIVATE_CHAT_RATE, 1)
+            else:
+                # Groups/channels: N per minute, allow a poster + video pair back to back
+                bucket = TokenBucket(settings.TG_GROUP_CHAT_PER_MINUTE / 60, 2)
+            self._chats[chat_id] = bucket
+            self._chat_locks[chat_id] = asyncio.Lock()
+        return self._chats[chat_id]
+
+    @staticmethod
+    def _normalize_chat(chat_id):
+        # '-100123' (from settings) and -100123 are the same chat
+        try:
+            return int(chat_id)
+        except (TypeError, ValueError):
+            return chat_id
+
+    def _priority(self, chat_id, rate_limit_args) -> int:
+        if isinstance(rate_limit_args, dict) and "priority" in rate_limit_args:
+            return rate_limit_args["priority"]
+        if chat_id is not None and chat_id == self._normalize_chat(settings.CHANNEL_ID):
+            return PRIORITY_PUBLISH
+        return PRIORITY_REPLY
+
+    async def _wait_chat(self, chat_id):
+        bucket = self._chat_bucket(chat_id)
+        async with self._chat_locks[chat_id]:
+            loop = asyncio.get_running_loop()
+            delay = bucket.delay(loop.time())
+            if delay > 0:
+                await asyncio.sleep(delay)
+            bucket.consume(loop.time())
+
+    async def _wait_global(self, priority: int):
+        loop = asyncio.get_running_loop()
+        entry = (priority, next(self._counter))
+        async with self._cond:
+            heapq.heappush(self._heap, entry)
+            try:
+                while True:
+                    if self._heap[0] == entry:
+                        now = loop.time()
+                        delay = max(self._global.delay(now), self._paused_until - now)
+                        if delay <= 0:
+                            heapq.heappop(self._heap)
+                            self._global.consume(now)
+                            self._cond.notify_all()
+                            return
+                        try:
+                            await asyncio.wait_for(self._cond.wait(), timeout=delay)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await self._cond.wait()
+            except asyncio.CancelledError:
+                if entry in self._heap:
+                    self._heap.remove(entry)
+                    heapq.heapify(self._heap)
+                    self._cond.notify_all()
+                raise
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = self._normalize_chat(data.get("chat_id"))
+        priority = self._priority(chat_id, rate_limit_args)
+
+        for attempt in range(settings.TG_MAX_RETRIES + 1):
+            if chat_id is not None:
+                await self._wait_chat(chat_id)
+            await self._wait_global(priority)
+            started = time.perf_counter()
+            try:
+                result = await callback(*args, **kwargs)
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                self.retry_after_count += 1
+                Metrics.inc("telegram_retry_after_total", endpoint=endpoint)
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+                # Shared backoff: every sender waits, not just this one
+                loop = asyncio.get_running_loop()
+                self._paused_until = max(self._paused_until, loop.time() + retry_after)
+                logger.warning(f"Flood control on {endpoint}: pausing all sends for {retry_after}s.")
+                if attempt == settings.TG_MAX_RETRIES:
+                    raise
+            except Exception:
+                Metrics.inc("telegram_errors_total", endpoint=endpoint)
+                raise
+            finally:
+                Metrics.observe("telegram", endpoint, time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and counters (for logs/metrics)."""
+        loop_time = asyncio.get_running_loop().time() if self._cond else 0
+        depth = {"publish": 0, "reply": 0}
+        for priority, _ in self._heap:
+            depth["publish" if priority == PRIORITY_PUBLISH else "reply"] += 1
+        return {
+            "queue_depth": depth,
+            "sent": self.sent,
+            "retry_after": self.retry_after_count,
+            "paused_for": max(0.0, self._paused_until - loop_time)
+        }
@@ -1,75 +1,190 @@
-import requests
+import asyncio
+import re
+import httpx
 import logging
-from typing import Optional, Dict
+from typing import Dict, List, Optional, Tuple
 from cinegram.config import settings
+from cinegram.services.http_client import HttpClient
+from cinegram.services.cache_store import CacheStore
+from cinegram.services.translation_service import TranslationService
 
 logger = logging.getLogger(__name__)
 
 class TmdbService:
     BASE_URL = "https://api.themoviedb.org/3"
-    IMAGE_BASE_URL = "https://image.tmdb.org/t/p/original"
+    IMAGE_BASE_URL = "https://image.tmdb.org/t/p/"
+    # TMDB poster size buckets (width in px); 'original' has no fixed width
+    POSTER_SIZES = [("w92", 92), ("w154", 154), ("w185", 185), ("w342", 342), ("w500", 500), ("w780", 780)]
+    POSTER_ASPECT = 2 / 3 # width / height of a TMDB poster
+    BACKDROP_SIZES = [("w300", 300), ("w780", 780), ("w1280", 1280)]
+    BACKDROP_ASPECT = 16 / 9
+
+    # Raw search results keyed by (title, year, language). None = "nothing found" (negative entry)
+    cache = CacheStore(
+        "tmdb_search",
+        ttl=settings.TMDB_CACHE_TTL,
+        negative_ttl=settings.TMDB_NEGATIVE_TTL,
+        memory_size=settings.TMDB_CACHE_MEMORY_SIZE
+    )
+
+    @staticmethod
+    def _cache_key(title: str, year: Optional[str], language: str) -> str:
+        """Normalizes the query so 'The  Matrix' and 'the matrix' share an entry."""
+        clean_title = re.sub(r'\s+', ' ', title).strip().casefold()
+        return f"{clean_title}|{year or ''}|{language}"
 
     @staticmethod
-    def search_movie(title: str, year: str = None) -> Optional[Dict]:
+    async def _lookup(title: str, year: Optional[str], language: str) -> Optional[Dict]:
         """
-        Searches for a movie on TMDB by title and optional year.
-        Returns the best match metadata.
+        Returns the best raw TMDB match for one language, using the cache.
+        Network errors are raised (and never cached).
         """
-        if not settings.TMDB_API_KEY:
-            logger.warning("TMDB_API_KEY is not set. Skipping TMDB search.")
-            return None
+        key = TmdbService._cache_key(title, year, language)
+        cached = TmdbService.cache.get(key)
+        if cached is not CacheStore.MISS:
+            return cached
 
-        url = f"{TmdbService.BASE_URL}/search/movie"
         params = {
             "api_key": settings.TMDB_API_KEY,
             "query": title,
-            "language": "es-MX", # Latin Spanish preference
+            "language": language,
             "page": 1
         }
         if year:
             params["year"] = year
 
+        response = await HttpClient.get(f"{TmdbService.BASE_URL}/search/movie", params=params)
+        response.raise_for_status()
+        results = response.json().get('results', [])
+
+        movie = None
+        if results:
+            # Keep only the fields we use
+            best = results[0]
+            movie = {
+                "id": best.get('id'),
+                "title": best.get('title'),
+                "overview": best.get('overview'),
+                "release_date": best.get('release_date'),
+                "poster_path": best.get('poster_path'),
+                "backdrop_path": best.get('backdrop_path'),
+                "genre_ids": best.get('genre_ids'),
+                "vote_average": best.get('vote_average')
+            }
+
+        TmdbService.cache.set(key, movie)
+        return movie
+
+    @staticmethod
+    async def _best_match(title: str, year: Optional[str]) -> Tuple[Optional[Dict], str]:
+        """Spanish (Latin) result first, English as a fallback. Returns (movie, language)."""
+        language = "es-MX" # Latin Spanish preference
+        movie = await TmdbService._lookup(title, year, language)
+
+        if not movie:
+            # RETRY WITH ENGLISH
+            language = "en-US"
+            movie = await TmdbService._lookup(title, year, language)
+        return movie, language
+
+    @staticmethod
+    async def search_movie(title: str, year: str = None, raise_errors: bool = False) -> Optional[Dict]:
+        """
+        Searches for a movie on TMDB by title and optional year.
+        Returns the best match metadata.
+        Network errors give None, or are raised with raise_errors (for callers that retry later).
+        """
+        if not settings.TMDB_API_KEY:
+            logger.warning("TMDB_API_KEY is not set. Skipping TMDB search.")
+            return None
+
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            results = response.json().get('results', [])
-            
-            if not results:
-                # RETRY WITH ENGLISH
-                params["language"] = "en-US"
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                results = response.json().get('results', [])
-
-            if results:
-                # Return the first (best) match
-                movie = results[0]
-                
+            movie, language = await TmdbService._best_match(title, year)
+
+            if movie:
                 # If we fell back to English, translate the overview
                 overview = movie.get('overview')
-                if overview and params.get("language") == "en-US":
-                    from cinegram.services.translation_service import TranslationService
-                    overview = TranslationService.translate_to_spanish(overview)
-
-                return {
-                    "title": movie.get('title'),
-                    "overview": overview,
-                    "release_date": movie.get('release_date'),
-                    "poster_path": movie.get('poster_path'),
-                    "genre_ids": movie.get('genre_ids'),
-                    "vote_average": movie.get('vote_average')
-                }
+                if overview and language == "en-US":
+                    overview = await TranslationService.translate_to_spanish(overview)
+
+                return {**movie, "overview": overview}
             return None
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"TMDB Search failed: {e}")
+            if raise_errors:
+                raise
             return None
 
     @staticmethod
-    def get_poster_url(poster_path: str) -> Optional[str]:
+    async def search_movies(queries: List[Tuple[str, Optional[str]]]) -> List[Optional[Dict]]:
+        """
+        Bulk search_movie for (title, year) pairs, in input order: the lookups run
+        concurrently and the English-only synopses are translated together with
+        translate_many. Network errors give None for that entry.
+        """
+        if not settings.TMDB_API_KEY or not queries:
+            return [None] * len(queries)
+
+        matches = await asyncio.gather(
+            *(TmdbService._best_match(title, year) for title, year in queries), return_exceptions=True
+        )
+        english = [
+            match[0]['overview'] for match in matches
+            if not isinstance(match, BaseException) and match[0] and match[1] == "en-US" and match[0].get('overview')
+        ]
+        translations = dict(zip(english, await TranslationService.translate_many(english)))
+
+        results = []
+        for (title, _), match in zip(queries, matches):
+            if isinstance(match, BaseException):
+                logger.error(f"TMDB Search failed for '{title}': {match}")
+                results.append(None)
+                continue
+            movie, language = match
+            if movie and language == "en-US" and movie.get('overview'):
+                movie = {**movie, "overview": translations[movie['overview']]}
+            results.append(movie)
+        return results
+
+    @staticmethod
+    def _pick_size(buckets: list, aspect: float, canvas=None) -> str:
+        """
+        Picks the smallest TMDB bucket that still covers the canvas after an aspect-fill
+        resize (allowing POSTER_MAX_UPSCALE), instead of always downloading 'original'.
+        """
+        width, height = canvas or settings.IMAGE_SIZE
+        needed_width = max(width, height * aspect) / settings.POSTER_MAX_UPSCALE
+        for name, bucket_width in buckets:
+            if bucket_width >= needed_width:
+                return name
+        return "original"
+
+    @staticmethod
+    def get_poster_size(canvas=None) -> str:
+        return TmdbService._pick_size(TmdbService.POSTER_SIZES, TmdbService.POSTER_ASPECT, canvas)
+
+    @staticmethod
+    def get_backdrop_size(canvas=None) -> str:
+        return TmdbService._pick_size(TmdbService.BACKDROP_SIZES, TmdbService.BACKDROP_ASPECT, canvas)
+
+    @staticmethod
+    def get_poster_url(poster_path: str, size: Optional[str] = None) -> Optional[str]:
         if not poster_path:
             return None
-        return f"{TmdbService.IMAGE_BASE_URL}{poster_path}"
+        return f"{TmdbService.IMAGE_BASE_URL}{size or TmdbService.get_poster_size()}{poster_path}"
+
+    @staticmethod
+    def get_artwork_url(tmdb_data: Dict, canvas=None) -> Optional[str]:
+        """
+        Source image for the generated poster. A landscape canvas only shows a thin middle
+        strip of a 2:3 poster and needs it 1920px wide ('original'); a 16:9 backdrop fills it
+        whole and w1280 covers it with the default upscale. Falls back to the poster.
+        """
+        width, height = canvas or settings.IMAGE_SIZE
+        if width > height and tmdb_data.get('backdrop_path'):
+            return f"{TmdbService.IMAGE_BASE_URL}{TmdbService.get_backdrop_size(canvas)}{tmdb_data['backdrop_path']}"
+        return TmdbService.get_poster_url(tmdb_data.get('poster_path'), TmdbService.get_poster_size(canvas))
 
     @staticmethod
     def get_genres(genre_ids: list) -> str:
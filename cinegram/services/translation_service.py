@@ -1,6 +1,14 @@
-import requests
+import asyncio
+import hashlib
+import json
 import logging
+import re
+import time
+from typing import Dict, List, Optional
 from cinegram.config import settings
+from cinegram.services.http_client import HttpClient
+from cinegram.services.cache_store import CacheStore
+from cinegram.services.metrics import Metrics
 
 logger = logging.getLogger(__name__)
 
@@ -8,17 +16,29 @@ class TranslationService:
     OLLAMA_URL = "http://localhost:11434/api/generate"
     # Configurable model
     MODEL = settings.OLLAMA_MODEL
+    # Bump when the prompt changes so old translations are not reused
+    PROMPT_VERSION = 1
+
+    # Finished translations keyed by content hash (persisted, LRU-evicted above the cap)
+    cache = CacheStore(
+        "translations",
+        ttl=settings.TRANSLATION_CACHE_TTL,
+        max_entries=settings.TRANSLATION_CACHE_MAX_ENTRIES
+    )
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _inflight: Dict[str, asyncio.Future] = {}
+    # Aggregate streaming stats (tokens/sec = tokens / seconds)
+    stats = {"requests": 0, "tokens": 0, "seconds": 0.0, "early_stops": 0, "budget_exceeded": 0}
 
     @staticmethod
-    def translate_to_spanish(text: str) -> str:
-        """
-        Translates text to Spanish using local Ollama model.
-        """
-        if not text:
-            return ""
+    def _cache_key(text: str) -> str:
+        raw = f"{TranslationService.MODEL}|{TranslationService.PROMPT_VERSION}|{text.strip()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
+    @staticmethod
+    def _build_prompt(text: str) -> str:
         # Prompt refined for Latin American Spanish and conciseness
-        prompt = (
+        return (
             "Translate the following movie synopsis to Spanish (Latin American). "
             "Then rewrite it as a short synopsis of maximum 5–6 lines. "
             "Use natural, neutral Latin American Spanish suitable for movie descriptions. "
@@ -26,27 +46,149 @@ class TranslationService:
             f"Text: {text}"
         )
 
+    @staticmethod
+    def _target_reached(text: str) -> bool:
+        """True once the output covers the 5-6 line synopsis target and ends a sentence."""
+        lines = [l for l in text.splitlines() if l.strip()]
+        if len(lines) > settings.TRANSLATION_MAX_LINES:
+            return True
+        return len(text) >= settings.TRANSLATION_MAX_CHARS and text.rstrip().endswith(('.', '!', '?'))
+
+    @staticmethod
+    def _trim_partial(text: str) -> Optional[str]:
+        """Keeps a partial answer up to its last full sentence, if there is enough of it."""
+        lines = [l for l in text.strip().splitlines() if l.strip()]
+        text = "\n".join(lines[:settings.TRANSLATION_MAX_LINES])
+        match = re.search(r'^.*[.!?]', text, re.DOTALL)
+        if match and len(match.group(0)) >= 80:
+            return match.group(0).strip()
+        return None
+
+    @staticmethod
+    async def _stream_translation(payload: dict) -> Optional[str]:
+        """
+        Consumes Ollama's NDJSON token stream, stopping early once the line target is
+        reached and giving up after TRANSLATION_TIME_BUDGET seconds (keeping any usable partial text).
+        """
+        parts = []
+        tokens = 0
+        done = False
+        started = time.monotonic()
+
+        async def consume():
+            nonlocal tokens, done
+            async with HttpClient.stream("POST", TranslationService.OLLAMA_URL, json=payload,
+                                         timeout=settings.TRANSLATION_TIME_BUDGET) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    parts.append(chunk.get('response', ''))
+                    tokens += 1
+                    if chunk.get('done'):
+                        done = True
+                        return
+                    if TranslationService._target_reached("".join(parts)):
+                        # Leaving the context closes the connection, which stops generation
+                        TranslationService.stats["early_stops"] += 1
+                        return
+
+        timed_out = False
+        try:
+            await asyncio.wait_for(consume(), timeout=settings.TRANSLATION_TIME_BUDGET)
+        except asyncio.TimeoutError:
+            timed_out = True
+            TranslationService.stats["budget_exceeded"] += 1
+
+        elapsed = time.monotonic() - started
+        TranslationService.stats["requests"] += 1
+        TranslationService.stats["tokens"] += tokens
+        TranslationService.stats["seconds"] += elapsed
+        logger.info(
+            f"Ollama stream: {tokens} tokens in {elapsed:.1f}s "
+            f"({tokens / elapsed if elapsed else 0:.1f} tok/s, done={done}, timed_out={timed_out})"
+        )
+
+        text = "".join(parts).strip()
+        if timed_out or not done:
+            return TranslationService._trim_partial(text)
+        return text or None
+
+    @staticmethod
+    async def _request_translation(text: str) -> Optional[str]:
+        """Calls Ollama once. Returns None on failure or empty output."""
+        stream = settings.TRANSLATION_STREAM
         payload = {
             "model": TranslationService.MODEL,
-            "prompt": prompt,
-            "stream": False,
+            "prompt": TranslationService._build_prompt(text),
+            "stream": stream,
             "options": {
                 "temperature": 0.3 # Low temp for accurate translation
             }
         }
 
+        # Bound concurrent LLM requests (a local Ollama only runs a few generations at once)
+        if TranslationService._semaphore is None:
+            TranslationService._semaphore = asyncio.Semaphore(settings.TRANSLATION_CONCURRENCY)
+
         try:
-            logger.info(f"Translating via Ollama ({TranslationService.MODEL})...")
-            response = requests.post(TranslationService.OLLAMA_URL, json=payload, timeout=30)
-            response.raise_for_status()
-            result = response.json()
-            translation = result.get('response', '').strip()
-            
-            if translation:
-                return translation
-            else:
-                return text # Fallback to original
-                
+            async with TranslationService._semaphore:
+                logger.info(f"Translating via Ollama ({TranslationService.MODEL})...")
+                with Metrics.timer("services", "translate"):
+                    if stream:
+                        return await TranslationService._stream_translation(payload)
+                    response = await HttpClient.post(TranslationService.OLLAMA_URL, json=payload, timeout=30)
+                    response.raise_for_status()
+                    result = response.json()
+            return result.get('response', '').strip() or None
+
         except Exception as e:
             logger.error(f"Ollama translation failed: {e}")
-            return text # Fallback to original
+            return None
+
+    @staticmethod
+    async def translate_to_spanish(text: str) -> str:
+        """
+        Translates text to Spanish using local Ollama model.
+        Results are memoized by content hash; identical requests in flight share one LLM call.
+        """
+        if not text:
+            return ""
+
+        key = TranslationService._cache_key(text)
+        cached = TranslationService.cache.get(key)
+        if cached is not CacheStore.MISS:
+            return cached
+
+        # Join an identical translation that is already running
+        pending = TranslationService._inflight.get(key)
+        if pending is not None:
+            translation = await asyncio.shield(pending)
+            return translation or text
+
+        future = asyncio.get_running_loop().create_future()
+        TranslationService._inflight[key] = future
+        translation = None
+        try:
+            translation = await TranslationService._request_translation(text)
+            if translation:
+                TranslationService.cache.set(key, translation)
+        finally:
+            future.set_result(translation)
+            del TranslationService._inflight[key]
+
+        return translation or text # Fallback to original
+
+    @staticmethod
+    async def translate_many(texts: List[str]) -> List[str]:
+        """
+        Batch mode for bulk imports: translates many synopses concurrently
+        (bounded by TRANSLATION_CONCURRENCY). Returns results in input order;
+        cached and duplicate texts are translated only once.
+        """
+        unique = list(dict.fromkeys(t for t in texts if t))
+        results = await asyncio.gather(*(TranslationService.translate_to_spanish(t) for t in unique))
+        translated = dict(zip(unique, results))
+        return [translated.get(t, "") for t in texts]
+
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Concurrent update processing (installed with ApplicationBuilder.concurrent_updates):
+    updates from different chats run in parallel, at most max_concurrent_updates at once,
+    while updates from the same chat still run one after another, in arrival order.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._chat_locks: Dict[Any, asyncio.Lock] = {}
+        self._chat_users: Dict[Any, int] = {}  # Updates holding/waiting for each lock (idle locks are dropped)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    @staticmethod
+    def _chat_key(update: object) -> Optional[Any]:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat:
+            return update.effective_chat.id
+        if update.effective_user: # e.g. pre-checkout queries have no chat
+            return update.effective_user.id
+        return None
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._chat_key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+
+        # Chat lock first, concurrency slot second: a chat with a backlog (e.g. 200 forwarded
+        # videos) waits on its own lock instead of filling every slot.
+        lock = self._chat_locks.setdefault(key, asyncio.Lock())
+        self._chat_users[key] = self._chat_users.get(key, 0) + 1
+        try:
+            async with lock:
+                await super().process_update(update, coroutine)
+        finally:
+            self._chat_users[key] -= 1
+            if not self._chat_users[key]:
+                del self._chat_users[key]
+                del self._chat_locks[key]
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    def stats(self) -> Dict[str, int]:
+        """In-flight updates and chats with queued updates (for logs/metrics)."""
+        return {
+            "in_flight": self.current_concurrent_updates,
+            "chats_waiting": sum(1 for users in self._chat_users.values() if users > 1)
+        }
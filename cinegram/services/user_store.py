@@ -0,0 +1,151 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Optional, Set
+from cinegram.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UserStore:
+    """
+    Embedded database (SQLite, WAL) for users, payments and entitlements.
+    Every grant is a row, so we know how each user got access (password, Stars, legacy whitelist).
+    On first open the legacy whitelist.json is imported once.
+    """
+    DB_PATH = settings.USERS_DB_PATH
+    LEGACY_WHITELIST = os.path.join(settings.ASSETS_DIR, "whitelist.json")
+
+    _conn: Optional[sqlite3.Connection] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _db() -> sqlite3.Connection:
+        if UserStore._conn is None:
+            with UserStore._lock:
+                if UserStore._conn is None:
+                    conn = sqlite3.connect(UserStore.DB_PATH, check_same_thread=False, isolation_level=None)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("PRAGMA synchronous=NORMAL")
+                    UserStore._create_schema(conn)
+                    UserStore._migrate_whitelist(conn)
+                    UserStore._conn = conn
+        return UserStore._conn
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                user_id INTEGER PRIMARY KEY,
+                first_name TEXT,
+                username TEXT,
+                created_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS entitlements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                kind TEXT NOT NULL DEFAULT 'access',
+                source TEXT NOT NULL,
+                payment_id INTEGER,
+                granted_at REAL NOT NULL,
+                expires_at REAL,
+                revoked_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entitlements_user ON entitlements(user_id, kind);
+            CREATE TABLE IF NOT EXISTS payments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                charge_id TEXT UNIQUE,
+                currency TEXT,
+                amount INTEGER,
+                payload TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_payments_user ON payments(user_id);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+
+    @staticmethod
+    def _migrate_whitelist(conn: sqlite3.Connection):
+        done = conn.execute("SELECT value FROM meta WHERE key = 'whitelist_migrated'").fetchone()
+        if done:
+            return
+        user_ids = []
+        if os.path.exists(UserStore.LEGACY_WHITELIST):
+            try:
+                with open(UserStore.LEGACY_WHITELIST, 'r') as f:
+                    user_ids = [int(u) for u in json.load(f)]
+            except Exception as e:
+                logger.error(f"Could not read legacy whitelist, skipping migration: {e}")
+                return
+
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN")
+            for user_id in user_ids:
+                conn.execute("INSERT OR IGNORE INTO users (user_id, created_at) VALUES (?, ?)", (user_id, now))
+                conn.execute(
+                    "INSERT INTO entitlements (user_id, source, granted_at) VALUES (?, 'whitelist', ?)",
+                    (user_id, now)
+                )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('whitelist_migrated', ?)", (str(now),))
+        logger.info(f"Migrated {len(user_ids)} users from whitelist.json.")
+
+    @staticmethod
+    def data_version() -> int:
+        """Changes whenever another connection commits (e.g. a manual edit with the sqlite3 CLI)."""
+        return UserStore._db().execute("PRAGMA data_version").fetchone()[0]
+
+    @staticmethod
+    def authorized_user_ids() -> Set[int]:
+        now = time.time()
+        rows = UserStore._db().execute(
+            "SELECT DISTINCT user_id FROM entitlements "
+            "WHERE kind = 'access' AND revoked_at IS NULL AND (expires_at IS NULL OR expires_at > ?)",
+            (now,)
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    @staticmethod
+    def has_access(user_id: int) -> bool:
+        row = UserStore._db().execute(
+            "SELECT 1 FROM entitlements WHERE user_id = ? AND kind = 'access' "
+            "AND revoked_at IS NULL AND (expires_at IS NULL OR expires_at > ?) LIMIT 1",
+            (user_id, time.time())
+        ).fetchone()
+        return row is not None
+
+    @staticmethod
+    def upsert_user(user_id: int, first_name: Optional[str] = None, username: Optional[str] = None):
+        UserStore._db().execute(
+            "INSERT INTO users (user_id, first_name, username, created_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET "
+            "first_name = COALESCE(excluded.first_name, first_name), username = COALESCE(excluded.username, username)",
+            (user_id, first_name, username, time.time())
+        )
+
+    @staticmethod
+    def grant_access(user_id: int, source: str, payment_id: Optional[int] = None, expires_at: Optional[float] = None):
+        db = UserStore._db()
+        with UserStore._lock, db:
+            db.execute("BEGIN")
+            db.execute("INSERT OR IGNORE INTO users (user_id, created_at) VALUES (?, ?)", (user_id, time.time()))
+            db.execute(
+                "INSERT INTO entitlements (user_id, source, payment_id, granted_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (user_id, source, payment_id, time.time(), expires_at)
+            )
+
+    @staticmethod
+    def record_payment(user_id: int, charge_id: str, currency: str, amount: int, payload: str) -> Optional[int]:
+        """Stores a payment. Returns its id, or None if this charge was already recorded."""
+        cursor = UserStore._db().execute(
+            "INSERT OR IGNORE INTO payments (user_id, charge_id, currency, amount, payload, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, charge_id, currency, amount, payload, time.time())
+        )
+        return cursor.lastrowid if cursor.rowcount else None
@@ -1,4 +1,6 @@
+import os
 import re
+import time
 
 def is_valid_archive_url(url: str) -> bool:
     """Checks if the URL is a valid Internet Archive identifier."""
@@ -11,3 +13,25 @@ def extract_identifier(url: str) -> str:
     if match:
         return match.group(1)
     return None
+
+def clean_temp_dir(directory: str, max_files: int, max_age: float) -> int:
+    """
+    Deletes generated posters older than max_age seconds and keeps at most
+    max_files of the newest ones. Returns the number of files removed.
+    """
+    try:
+        entries = [e for e in os.scandir(directory) if e.is_file() and e.name.endswith("_poster.jpg")]
+    except FileNotFoundError:
+        return 0
+
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    now = time.time()
+    removed = 0
+    for index, entry in enumerate(entries):
+        if index >= max_files or now - entry.stat().st_mtime > max_age:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
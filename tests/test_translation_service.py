@@ -0,0 +1,104 @@
+"""
+TranslationService.translate_many against a mocked Ollama (httpx.MockTransport on the
+shared HttpClient; no Ollama server needed).
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+import asyncio
+import json
+import os
+import tempfile
+
+# Settings are read at import time: keep the translation cache out of the real cache dir
+os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="cinegram-tests-")
+
+import httpx
+from cinegram.config import settings
+from cinegram.services.http_client import HttpClient
+from cinegram.services.translation_service import TranslationService
+
+
+class FakeOllama:
+    """Answers /api/generate like Ollama (NDJSON stream or one JSON object) and records the prompts."""
+
+    def __init__(self, latency: float = 0.01, fail: bool = False):
+        self.latency = latency
+        self.fail = fail
+        self.prompts = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        text = payload["prompt"].rsplit("Text: ", 1)[1]
+        self.prompts.append(text)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+        if self.fail:
+            return httpx.Response(500, text="model not loaded")
+
+        answer = f"ES: {text}."
+        if not payload["stream"]:
+            return httpx.Response(200, json={"response": answer, "done": True})
+        lines = [json.dumps({"response": word + " ", "done": False}) for word in answer.split()]
+        lines.append(json.dumps({"response": "", "done": True}))
+        return httpx.Response(200, content="\n".join(lines).encode("utf-8"))
+
+
+def run(ollama: FakeOllama, coro_factory):
+    """Runs a coroutine on a fresh loop with the mocked Ollama behind HttpClient."""
+    async def main():
+        HttpClient._client = httpx.AsyncClient(transport=httpx.MockTransport(ollama))
+        TranslationService._semaphore = None # Bound to the previous test's loop otherwise
+        try:
+            return await coro_factory()
+        finally:
+            await HttpClient.close()
+    return asyncio.run(main())
+
+
+def test_translate_many_keeps_order_and_translates_duplicates_once():
+    ollama = FakeOllama()
+    texts = ["order one", "", "order two", "order one", "order three"]
+
+    result = run(ollama, lambda: TranslationService.translate_many(texts))
+
+    assert result == ["ES: order one.", "", "ES: order two.", "ES: order one.", "ES: order three."]
+    assert sorted(ollama.prompts) == ["order one", "order three", "order two"]
+
+
+def test_translate_many_reuses_the_cache():
+    ollama = FakeOllama()
+    run(ollama, lambda: TranslationService.translate_many(["cached one", "cached two"]))
+    assert len(ollama.prompts) == 2
+
+    result = run(ollama, lambda: TranslationService.translate_many(["cached two", "cached three", "cached one"]))
+
+    assert result == ["ES: cached two.", "ES: cached three.", "ES: cached one."]
+    assert ollama.prompts[2:] == ["cached three"]
+
+
+def test_translate_many_bounds_concurrent_requests():
+    ollama = FakeOllama(latency=0.05)
+    texts = [f"bounded {i}" for i in range(8)]
+
+    result = run(ollama, lambda: TranslationService.translate_many(texts))
+
+    assert result == [f"ES: {text}." for text in texts]
+    assert ollama.max_active == settings.TRANSLATION_CONCURRENCY
+
+
+def test_translate_many_falls_back_to_the_original_text():
+    ollama = FakeOllama(fail=True)
+
+    result = run(ollama, lambda: TranslationService.translate_many(["failing one", "failing two"]))
+
+    assert result == ["failing one", "failing two"]
+    # Failures are not cached: the next batch asks Ollama again
+    run(ollama, lambda: TranslationService.translate_many(["failing one"]))
+    assert ollama.prompts.count("failing one") == 2